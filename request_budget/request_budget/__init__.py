@@ -0,0 +1,21 @@
+"""Per-request query/latency accounting for the API projects in this repository.
+
+Add 'request_budget.middleware.RequestBudgetMiddleware' to MIDDLEWARE. Every
+request then records its SQL query count, DB time, serializer time and total
+time. These are sent back in a Server-Timing header (REQUEST_BUDGET_SERVER_TIMING,
+on by default when DEBUG). A warning is logged on the 'request_budget' logger
+when a view goes over its budget:
+
+    REQUEST_BUDGET_QUERIES = 20      # per request, for every view
+    REQUEST_BUDGET_MS = 500
+    REQUEST_BUDGETS = {'post-list': {'queries': 5}}  # per view name (or route), overrides the above
+
+Tests can assert budgets with request_budget.testing.QueryBudgetAssertions.
+
+Serializer time comes from wrapping BaseSerializer.data for the whole
+process when the middleware is first loaded (see
+middleware._instrument_serializers); outside a request the wrapper just
+calls through.
+
+Installed into each project with `-e ../request_budget` in its requirements.
+"""
@@ -0,0 +1,136 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('request_budget')
+
+_current = contextvars.ContextVar('request_budget', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RequestStats:
+    """What one request spent: queries and time (ms) in the database, serializers and overall."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.total_ms = 0.0
+        self.route = None
+        self._serializing = 0  # nesting depth, so nested serializers aren't counted twice
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+    def server_timing(self):
+        return (
+            f'db;desc="{self.queries} queries";dur={self.db_ms:.1f}, '
+            f'serializer;dur={self.serializer_ms:.1f}, total;dur={self.total_ms:.1f}'
+        )
+
+
+def current():
+    """The RequestStats of the request being served, or None outside RequestBudgetMiddleware."""
+    return _current.get()
+
+
+_patch_lock = threading.Lock()
+
+
+def _instrument_serializers():
+    """Time BaseSerializer.data, the one place every DRF serializer is turned into primitives.
+
+    This replaces the property on DRF's class, so it applies to every
+    serializer in the process, not just those of views behind the
+    middleware; outside a request it only calls through. Each call wraps
+    DRF's original again rather than whatever is installed, so loading the
+    middleware twice, or a reloaded copy of this module, never stacks
+    wrappers or leaves one reading a stale contextvar.
+    """
+    from rest_framework.serializers import BaseSerializer
+    with _patch_lock:
+        data = BaseSerializer.data.fget
+        data = getattr(data, 'request_budget_original', data)
+
+        def timed_data(serializer):
+            stats = _current.get()
+            if stats is None or stats._serializing:
+                return data(serializer)
+            stats._serializing += 1
+            started = time.perf_counter()
+            try:
+                return data(serializer)
+            finally:
+                stats._serializing -= 1
+                stats.serializer_ms += (time.perf_counter() - started) * 1000
+
+        timed_data.request_budget_original = data
+        BaseSerializer.data = property(timed_data)
+
+
+def budget_for(route):
+    budget = {
+        'queries': _setting('REQUEST_BUDGET_QUERIES', 20),
+        'ms': _setting('REQUEST_BUDGET_MS', 500),
+    }
+    budget.update(_setting('REQUEST_BUDGETS', {}).get(route, {}))
+    return budget
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match.route
+
+
+class RequestBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_serializers()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        stats.total_ms = (time.perf_counter() - started) * 1000
+        stats.route = _route(request)
+        response.request_budget = stats  # read by request_budget.testing
+        if _setting('REQUEST_BUDGET_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = stats.server_timing()
+        if stats.route is not None:
+            self.check(request, stats)
+        return response
+
+    def check(self, request, stats):
+        budget = budget_for(stats.route)
+        over = []
+        if budget['queries'] is not None and stats.queries > budget['queries']:
+            over.append(f"{stats.queries} queries (budget {budget['queries']})")
+        if budget['ms'] is not None and stats.total_ms > budget['ms']:
+            over.append(f"{stats.total_ms:.0f}ms (budget {budget['ms']}ms)")
+        if over:
+            logger.warning(
+                '%s %s over budget: %s; db %.1fms, serializer %.1fms',
+                request.method, stats.route, ', '.join(over), stats.db_ms, stats.serializer_ms,
+                extra={'route': stats.route, 'queries': stats.queries, 'total_ms': stats.total_ms},
+            )
@@ -0,0 +1,24 @@
+from .middleware import budget_for
+
+
+class QueryBudgetAssertions:
+    """TestCase mixin for responses served through RequestBudgetMiddleware.
+
+        response = self.client.get('/api/posts/')
+        self.assertQueryBudget(response)      # the view's configured REQUEST_BUDGETS entry
+        self.assertQueryBudget(response, 3)   # or an explicit number
+
+    Unlike assertNumQueries, this counts the whole request, including
+    authentication and middleware, and names the route that went over.
+    """
+
+    def assertQueryBudget(self, response, queries=None):
+        stats = getattr(response, 'request_budget', None)
+        if stats is None:
+            self.fail('response has no request_budget; is RequestBudgetMiddleware installed?')
+        limit = queries if queries is not None else budget_for(stats.route)['queries']
+        if stats.queries > limit:
+            self.fail(
+                f'{stats.route} made {stats.queries} queries (budget {limit}); '
+                f'db {stats.db_ms:.1f}ms, serializer {stats.serializer_ms:.1f}ms'
+            )
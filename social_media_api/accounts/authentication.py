@@ -0,0 +1,110 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class LRUCache:
+    """Small thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TokenCache:
+    """token key -> (user, token) snapshots: a local LRU in front of an optional shared cache."""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'TOKEN_CACHE_TTL', 60)
+        self.local = LRUCache(getattr(settings, 'TOKEN_CACHE_SIZE', 10000), self.ttl)
+        alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+        self.shared = caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        return f'auth:token:{key}'
+
+    def get(self, key):
+        snapshot = self.local.get(key)
+        if snapshot is None and self.shared is not None:
+            snapshot = self.shared.get(self._shared_key(key))
+            if snapshot is not None:
+                self.local.set(key, snapshot)
+        return snapshot
+
+    def set(self, key, snapshot):
+        self.local.set(key, snapshot)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), snapshot, self.ttl)
+
+    def invalidate(self, key):
+        # other processes' local tiers keep the entry until TOKEN_CACHE_TTL runs out
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    with _token_cache_lock:
+        if _token_cache is None:
+            _token_cache = TokenCache()
+        return _token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the Token + User query for recently seen tokens.
+
+    Snapshots are dropped when a token is deleted or rotated and whenever the
+    user row is saved (e.g. deactivated); see accounts.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        snapshot = token_cache.get(key)
+        if snapshot is None:
+            snapshot = super().authenticate_credentials(key)
+            token_cache.set(key, snapshot)
+        user, token = snapshot
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # a deep copy, so _state and cached relations aren't shared with the snapshot
+        # (or with another thread serving the same token) when a view modifies request.user
+        return copy.deepcopy(user), token
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from . import graph
+
+User = get_user_model()
+Follow = User.followers.through  # row (from_customuser=A, to_customuser=B) means B follows A
+
+
+def _lock(user):
+    # serializes follow changes made by one user so the counters see every row exactly once
+    User.objects.select_for_update().filter(pk=user.pk).values_list('pk').first()
+
+
+def _adjust_counts(follower_id, followed_ids, delta):
+    if not followed_ids:
+        return
+    User.objects.filter(id__in=followed_ids).update(follower_count=F('follower_count') + delta)
+    User.objects.filter(id=follower_id).update(following_count=F('following_count') + delta * len(followed_ids))
+    graph.invalidate(follower_id, *followed_ids)
+
+
+def follow(user, target):
+    """Make `user` follow `target`; returns False if they already did."""
+    try:
+        with transaction.atomic():
+            _lock(user)
+            Follow.objects.create(from_customuser=target, to_customuser=user)
+            _adjust_counts(user.id, [target.id], +1)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, target):
+    """Make `user` stop following `target`; returns False if they weren't."""
+    with transaction.atomic():
+        _lock(user)
+        deleted, _ = Follow.objects.filter(from_customuser=target, to_customuser=user).delete()
+        if deleted:
+            _adjust_counts(user.id, [target.id], -1)
+    return bool(deleted)
+
+
+@transaction.atomic
+def follow_many(user, target_ids):
+    """Follow every id in `target_ids` with one INSERT; returns the ids that were newly followed."""
+    _lock(user)
+    target_ids = set(target_ids) - {user.id}
+    existing = set(
+        Follow.objects.filter(to_customuser=user, from_customuser__in=target_ids)
+        .values_list('from_customuser_id', flat=True)
+    )
+    new_ids = sorted(target_ids - existing)
+    Follow.objects.bulk_create(
+        [Follow(from_customuser_id=uid, to_customuser_id=user.id) for uid in new_ids],
+        ignore_conflicts=True,
+    )
+    _adjust_counts(user.id, new_ids, +1)
+    return new_ids
+
+
+@transaction.atomic
+def unfollow_many(user, target_ids):
+    """Unfollow every id in `target_ids`; returns the ids that were actually unfollowed."""
+    _lock(user)
+    rows = Follow.objects.filter(to_customuser=user, from_customuser__in=set(target_ids))
+    removed_ids = sorted(rows.values_list('from_customuser_id', flat=True))
+    rows.delete()
+    _adjust_counts(user.id, removed_ids, -1)
+    return removed_ids
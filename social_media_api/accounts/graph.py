@@ -0,0 +1,27 @@
+"""Per-user follow-graph version for caches built from a user's follows.
+
+Cache keys that include version(user_id) stop matching once that user's
+follows change. The bump only reaches the cache it is written to, so with a
+per-process cache other workers keep their entries until those expire; only
+cache derived data here (suggestions), never what a write path decides on.
+"""
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+
+TIMEOUT = 60 * 60 * 24
+
+
+def version(user_id):
+    return cache.get_or_set(f'graph:version:{user_id}', 0, TIMEOUT)
+
+
+def invalidate(*user_ids):
+    """Bump the graph version of each user after the current transaction commits.
+
+    Old entries are never read again and simply expire, so a reader racing
+    the write can't put a stale value back under the new version.
+    """
+    def bump():
+        cache.set_many({f'graph:version:{uid}': uuid.uuid4().hex for uid in user_ids}, TIMEOUT)
+    transaction.on_commit(bump)
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Overloaded(Exception):
+    """The hashing queue is full; the caller should back off and retry."""
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets held in process memory, bounded to `max_keys` (LRU)."""
+
+    def __init__(self, capacity, refill_per_second, max_keys=100000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Take one token for `key`; returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        wait = 0 if allowed else (1 - tokens) / self.refill_per_second
+        return allowed, wait
+
+
+class HashMetrics:
+    """Counters and recent timings for password checks."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self._recent.append(seconds)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            count, rejected, total = self.count, self.rejected, self.total_seconds
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 1) if recent else None
+
+        return {
+            'count': count,
+            'rejected': rejected,
+            'mean_ms': round(total / count * 1000, 1) if count else None,
+            'p50_ms': pct(0.50),
+            'p99_ms': pct(0.99),
+        }
+
+
+class HashingPool:
+    """Runs authenticate() (PBKDF2) on a few dedicated threads with a bounded queue.
+
+    At most `workers` hashes run at once and at most `max_queue` more may
+    wait; anything beyond that is rejected immediately with Overloaded, so a
+    credential-stuffing burst gets fast 503s instead of pinning every web
+    worker on CPU.
+    """
+
+    def __init__(self, workers, max_queue, timeout):
+        self.timeout = timeout
+        self.metrics = HashMetrics()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def _authenticate(self, username, password):
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            return authenticate(username=username, password=password)
+        finally:
+            self.metrics.record(time.perf_counter() - started)
+            close_old_connections()
+
+    def authenticate(self, username, password):
+        if not self._slots.acquire(blocking=False):
+            self.metrics.reject()
+            logger.warning('password hashing queue full; rejecting login')
+            raise Overloaded()
+        try:
+            future = self._executor.submit(self._authenticate, username, password)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            self.metrics.reject()
+            logger.warning('password check took longer than %ss; rejecting login', self.timeout)
+            raise Overloaded()
+
+
+_lock = threading.Lock()
+_pool = None
+_limiters = None
+
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = HashingPool(
+                workers=_setting('LOGIN_HASH_WORKERS', 2),
+                max_queue=_setting('LOGIN_HASH_QUEUE', 8),
+                timeout=_setting('LOGIN_HASH_TIMEOUT', 5),
+            )
+        return _pool
+
+
+def get_limiters():
+    """(per-IP, per-username-and-IP) limiters; rates are (attempts, per seconds)."""
+    global _limiters
+    with _lock:
+        if _limiters is None:
+            _limiters = tuple(
+                TokenBucketLimiter(capacity=attempts, refill_per_second=attempts / seconds)
+                for attempts, seconds in (
+                    _setting('LOGIN_RATE_PER_IP', (20, 60)),
+                    _setting('LOGIN_RATE_PER_USERNAME', (5, 60)),
+                )
+            )
+        return _limiters
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-17 07:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk):
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    return Coalesce(Subquery(rows.annotate(n=Count('*')).values('n')), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    # self-contained on purpose: migrations must not change when app code does
+    User = apps.get_model('accounts', 'CustomUser')
+    Follow = User.followers.through  # from_customuser is followed by to_customuser
+    User.objects.update(
+        follower_count=_count(Follow, 'from_customuser'),
+        following_count=_count(Follow, 'to_customuser'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 07:25
+
+from django.db import migrations, models
+
+# The auto-created follow table can't declare Meta.indexes, so the (user, row id) indexes
+# backing the paginated follower/following lists are added through the schema editor.
+INDEXES = [
+    models.Index(fields=['from_customuser', 'id'], name='followers_followed_id_idx'),
+    models.Index(fields=['to_customuser', 'id'], name='followers_follower_id_idx'),
+]
+
+
+def add_indexes(apps, schema_editor):
+    Follow = apps.get_model('accounts', 'CustomUser').followers.through
+    for index in INDEXES:
+        schema_editor.add_index(Follow, index)
+
+
+def remove_indexes(apps, schema_editor):
+    Follow = apps.get_model('accounts', 'CustomUser').followers.through
+    for index in INDEXES:
+        schema_editor.remove_index(Follow, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
@@ -9,4 +9,7 @@ class CustomUser(AbstractUser):
         symmetrical=False,    # if A follows B, B doesn't auto-follow A
         related_name='following',
         blank=True
-    )
\ No newline at end of file
+    )
+    # denormalized counts, kept in sync with F() updates in the follow views
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
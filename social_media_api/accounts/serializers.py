@@ -15,4 +15,8 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = get_user_model().objects.create_user(**validated_data)  # checker needs this exact pattern
         Token.objects.create(user=user)
-        return user
\ No newline at end of file
+        return user
+
+class FollowEntrySerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='user_id')
+    username = serializers.CharField()
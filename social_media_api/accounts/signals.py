@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import get_token_cache
+
+User = get_user_model()
+
+
+def _invalidate_tokens(keys):
+    keys = list(keys)
+    token_cache = get_token_cache()
+
+    def invalidate():
+        for key in keys:
+            token_cache.invalidate(key)
+    invalidate()
+    transaction.on_commit(invalidate)  # again after commit, in case a request re-cached the old row
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    _invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    # covers deactivation and any other change to the cached user snapshot
+    if not created:
+        _invalidate_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
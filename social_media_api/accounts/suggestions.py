@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F
+from .follows import Follow
+from . import graph
+
+TIMEOUT = 60 * 10
+
+
+def people_you_may_know(user, limit=20):
+    """Friends of friends ranked by how many of the people you follow follow them.
+
+    One aggregated query over the follow table, cached per user; the cache
+    key carries the user's graph version, so following someone invalidates it.
+    """
+    key = f'suggestions:{user.id}:{graph.version(user.id)}:{limit}'
+    suggestions = cache.get(key)
+    if suggestions is None:
+        # from the primary: a lagging replica read under a just-bumped version would stay cached for TIMEOUT
+        follows = Follow.objects.using(DEFAULT_DB_ALIAS)
+        following = follows.filter(to_customuser=user).values('from_customuser_id')
+        rows = (
+            follows.filter(to_customuser_id__in=following)   # rows where someone I follow follows X
+            .exclude(from_customuser_id__in=following)
+            .exclude(from_customuser_id=user.id)
+            .values('from_customuser_id', username=F('from_customuser__username'))
+            .annotate(mutual=Count('*'))
+            .order_by('-mutual', 'from_customuser_id')[:limit]
+        )
+        suggestions = [
+            {'id': row['from_customuser_id'], 'username': row['username'], 'mutual': row['mutual']}
+            for row in rows
+        ]
+        cache.set(key, suggestions, TIMEOUT)
+    return suggestions
@@ -1,3 +1,196 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APITransactionTestCase
+from .authentication import CachedTokenAuthentication, LRUCache
+from .login import HashingPool, Overloaded, TokenBucketLimiter
+from . import follows, graph, login
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob, self.carol = User.objects.bulk_create(
+            [User(username='alice'), User(username='bob'), User(username='carol')]
+        )
+
+    def test_version_changes_when_follows_commit(self):
+        before = [graph.version(u.id) for u in (self.alice, self.bob, self.carol)]
+        with self.captureOnCommitCallbacks(execute=True):
+            follows.follow(self.alice, self.bob)
+        after = [graph.version(u.id) for u in (self.alice, self.bob, self.carol)]
+        self.assertNotEqual(after[:2], before[:2])
+        self.assertEqual(after[2], before[2])  # carol's follows didn't change
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.star = User.objects.create_user(username='star', password='pass12345')
+        self.fans = User.objects.bulk_create([User(username=f'fan{i:02}') for i in range(15)])
+        for fan in self.fans:
+            follows.follow(fan, self.star)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.star).key)
+
+    def test_profile_returns_counts_only(self):
+        response = self.client.get('/api/accounts/profile/')
+        self.assertEqual(response.data['follower_count'], 15)
+        self.assertNotIn('followers', response.data)
+
+    def test_followers_are_cursor_paginated_newest_first(self):
+        with self.assertNumQueries(2):  # token + one page
+            first = self.client.get('/api/accounts/profile/followers/')
+        second = self.client.get(first.data['next'])
+        usernames = [f['username'] for f in first.data['results'] + second.data['results']]
+        self.assertEqual(usernames, [f'fan{i:02}' for i in reversed(range(15))])
+        self.assertIsNone(second.data['next'])
+
+    def test_following_of_another_user(self):
+        response = self.client.get(f'/api/accounts/{self.fans[0].id}/following/')
+        self.assertEqual(response.data['results'], [{'id': self.star.id, 'username': 'star'}])
+        self.assertEqual(self.client.get('/api/accounts/999/following/').status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkFollowTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create_user(username='me', password='pass12345')
+        self.others = User.objects.bulk_create([User(username=f'user{i}') for i in range(5)])
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.me).key)
+
+    def test_bulk_follow_and_unfollow(self):
+        ids = [u.id for u in self.others]
+        follows.follow(self.me, self.others[0])
+        with self.assertNumQueries(10):  # token, in_bulk, savepoint, lock, existing, insert, 2 counters, release, timeline
+            response = self.client.post('/api/accounts/follow/bulk/', {'user_ids': ids + [999]}, format='json')
+        self.assertEqual(response.data, {'followed': ids[1:], 'not_found': [999]})
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 5)
+
+        response = self.client.post('/api/accounts/unfollow/bulk/', {'user_ids': ids[:2]}, format='json')
+        self.assertEqual(response.data['unfollowed'], ids[:2])
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 3)
+
+    def test_suggestions_are_friends_of_friends(self):
+        a, b, c, d, e = self.others
+        follows.follow(self.me, a)
+        follows.follow(self.me, b)
+        follows.follow(a, c)
+        follows.follow(b, c)
+        follows.follow(a, d)
+        follows.follow(a, b)  # already followed by me, not suggested
+        follows.follow(a, self.me)
+
+        response = self.client.get('/api/accounts/suggestions/')
+        self.assertEqual(
+            response.data['results'],
+            [{'id': c.id, 'username': c.username, 'mutual': 2}, {'id': d.id, 'username': d.username, 'mutual': 1}],
+        )
+        with self.assertNumQueries(0):  # token and suggestions both come from caches
+            self.client.get('/api/accounts/suggestions/')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='me', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_second_request_skips_token_query(self):
+        self.client.get('/api/notifications/unread_count/')
+        with self.assertNumQueries(1):  # the unread count only
+            cache.clear()
+            response = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivation_and_rotation_invalidate(self):
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 401)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 401)
+
+    def test_each_request_gets_its_own_user(self):
+        auth = CachedTokenAuthentication()
+        first, _ = auth.authenticate_credentials(self.token.key)
+        first.first_name = 'changed'
+        first._state.adding = True
+        second, _ = auth.authenticate_credentials(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertIsNot(first._state, second._state)
+        self.assertEqual((second.first_name, second._state.adding), ('', False))
+
+    def test_lru_evicts_oldest_and_expires(self):
+        lru = LRUCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+        lru.ttl = -1
+        lru.set('d', 4)
+        self.assertIsNone(lru.get('d'))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, LOGIN_RATE_PER_USERNAME=(2, 60))
+class LoginTests(APITransactionTestCase):
+    # password checks run on the hashing pool's own connection, so the user must be committed
+    def setUp(self):
+        login._limiters = None
+        User.objects.create_user(username='me', password='pass12345')
+
+    def tearDown(self):
+        login._limiters = None
+
+    def test_login_and_username_rate_limit(self):
+        response = self.client.post('/api/accounts/login/', {'username': 'me', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.data)
+        self.assertEqual(
+            self.client.post('/api/accounts/login/', {'username': 'me', 'password': 'wrong'}).status_code, 400
+        )
+        response = self.client.post('/api/accounts/login/', {'username': 'me', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_username_limit_is_per_ip_and_ignores_forwarded_for(self):
+        attacker = {'REMOTE_ADDR': '10.0.0.1'}
+        for _ in range(2):
+            self.client.post('/api/accounts/login/', {'username': 'me', 'password': 'wrong'}, **attacker)
+        response = self.client.post('/api/accounts/login/', {'username': 'me', 'password': 'wrong'},
+                                    HTTP_X_FORWARDED_FOR='10.9.9.9', **attacker)
+        self.assertEqual(response.status_code, 429)  # a spoofed header is not a fresh bucket
+
+        response = self.client.post('/api/accounts/login/', {'username': 'me', 'password': 'pass12345'},
+                                    REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)  # the owner elsewhere is not locked out
+
+    def test_full_queue_is_rejected(self):
+        pool = HashingPool(workers=1, max_queue=0, timeout=5)
+        pool._slots.acquire()  # a check already in flight
+        with self.assertRaises(Overloaded):
+            pool.authenticate('me', 'pass12345')
+        pool._slots.release()
+        self.assertEqual(pool.authenticate('me', 'pass12345').username, 'me')
+        snapshot = pool.metrics.snapshot()
+        self.assertEqual((snapshot['count'], snapshot['rejected']), (1, 1))
+
+    def test_token_bucket_waits_for_refill(self):
+        limiter = TokenBucketLimiter(capacity=1, refill_per_second=0.5)
+        self.assertEqual(limiter.allow('k'), (True, 0))
+        allowed, wait = limiter.allow('k')
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 2, places=1)
+        self.assertTrue(limiter.allow('other')[0])
@@ -1,9 +1,21 @@
 from django.urls import path
-from .views import RegisterView, LoginView, follow_user, unfollow_user
+from .views import (
+    RegisterView, LoginView, UserProfileView, FollowListView, login_metrics,
+    follow_user, unfollow_user, follow_users, unfollow_users, follow_suggestions,
+)
 
 urlpatterns = [
     path('register/', RegisterView.as_view()),
     path('login/', LoginView.as_view()),
+    path('login/metrics/', login_metrics),
+    path('profile/', UserProfileView.as_view()),
+    path('profile/followers/', FollowListView.as_view(relation='followers')),
+    path('profile/following/', FollowListView.as_view(relation='following')),
+    path('<int:user_id>/followers/', FollowListView.as_view(relation='followers')),
+    path('<int:user_id>/following/', FollowListView.as_view(relation='following')),
     path('follow/<int:user_id>/', follow_user),
     path('unfollow/<int:user_id>/', unfollow_user),
-]
\ No newline at end of file
+    path('follow/bulk/', follow_users),
+    path('unfollow/bulk/', unfollow_users),
+    path('suggestions/', follow_suggestions),
+]
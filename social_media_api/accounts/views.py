@@ -1,9 +1,17 @@
+import math
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate, get_user_model
-from .serializers import RegisterSerializer
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from posts import timeline
+from .serializers import RegisterSerializer, FollowEntrySerializer
+from .follows import Follow
+from .suggestions import people_you_may_know
+from . import follows, login
+
+MAX_BULK_FOLLOW = 100
 
 User = get_user_model()
 
@@ -23,12 +31,29 @@ class LoginView(generics.GenericAPIView):
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
-        user = authenticate(username=username, password=password)
+        # REMOTE_ADDR only: X-Forwarded-For is client-supplied unless a trusted proxy rewrites it.
+        # The username bucket is per IP too, so failed attempts elsewhere can't lock the owner out.
+        ip = request.META.get('REMOTE_ADDR')
+        for limiter, key in zip(login.get_limiters(), (f'ip:{ip}', f'user:{username}:{ip}')):
+            allowed, wait = limiter.allow(key)
+            if not allowed:
+                return Response({'error': 'Too many login attempts'}, status=429,
+                                headers={'Retry-After': str(math.ceil(wait))})
+        try:
+            user = login.get_pool().authenticate(username, password)
+        except login.Overloaded:
+            return Response({'error': 'Login is busy, try again shortly'}, status=503,
+                            headers={'Retry-After': '1'})
         if user:
             token, _ = Token.objects.get_or_create(user=user)
             return Response({'token': token.key})
         return Response({'error': 'Invalid credentials'}, status=400)
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def login_metrics(request):
+    return Response(login.get_pool().metrics.snapshot())
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def follow_user(request, user_id):
@@ -38,7 +63,8 @@ def follow_user(request, user_id):
         return Response({'error': 'User not found'}, status=404)
     if user_to_follow == request.user:
         return Response({'error': 'You cannot follow yourself'}, status=400)
-    request.user.following.add(user_to_follow)
+    if follows.follow(request.user, user_to_follow):  # False if already following
+        timeline.add_author(request.user, user_to_follow)  # backfill their recent posts into our feed
     return Response({'message': f'You are now following {user_to_follow.username}'})
 
 @api_view(['POST'])
@@ -48,9 +74,47 @@ def unfollow_user(request, user_id):
         user_to_unfollow = User.objects.get(id=user_id)
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=404)
-    request.user.following.remove(user_to_unfollow)
+    if follows.unfollow(request.user, user_to_unfollow):
+        timeline.remove_author(request.user, user_to_unfollow)
     return Response({'message': f'You have unfollowed {user_to_unfollow.username}'})
 
+def _user_ids(request):
+    ids = request.data.get('user_ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return None, Response({'error': 'user_ids must be a non-empty list of user ids'}, status=400)
+    if len(ids) > MAX_BULK_FOLLOW:
+        return None, Response({'error': f'At most {MAX_BULK_FOLLOW} user ids per request'}, status=400)
+    return ids, None
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def follow_users(request):
+    ids, error = _user_ids(request)
+    if error:
+        return error
+    users = User.objects.in_bulk(ids)  # one query validates every id
+    followed = follows.follow_many(request.user, list(users))
+    timeline.add_authors(request.user, [users[uid] for uid in followed])
+    return Response({
+        'followed': followed,
+        'not_found': sorted(set(ids) - set(users)),
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def unfollow_users(request):
+    ids, error = _user_ids(request)
+    if error:
+        return error
+    unfollowed = follows.unfollow_many(request.user, ids)
+    timeline.remove_authors(request.user, unfollowed)
+    return Response({'unfollowed': unfollowed})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def follow_suggestions(request):
+    return Response({'results': people_you_may_know(request.user)})
+
 from .models import CustomUser
 
 class UserProfileView(generics.GenericAPIView):
@@ -59,12 +123,35 @@ class UserProfileView(generics.GenericAPIView):
 
     def get(self, request):
         user = request.user
+        user.refresh_from_db(fields=['follower_count', 'following_count'])  # request.user may be a cached snapshot
         return Response({
             'id': user.id,
             'username': user.username,
             'email': user.email,
             'bio': user.bio,
             'profile_picture': str(user.profile_picture),
-            'followers': [f.username for f in user.followers.all()],
-            'following': [f.username for f in user.following.all()],
-        })
\ No newline at end of file
+            'follower_count': user.follower_count,
+            'following_count': user.following_count,
+        })
+
+class FollowListView(generics.ListAPIView):
+    # cursor-paginated followers/following, read straight off the follow table
+    serializer_class = FollowEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-id',)  # follow row id, i.e. most recent first
+    relation = None  # 'followers' or 'following'
+
+    def get_queryset(self):
+        user_id = self.kwargs.get('user_id', self.request.user.id)
+        if self.relation == 'followers':  # rows where user_id is followed
+            match, other = 'from_customuser_id', 'to_customuser'
+        else:
+            match, other = 'to_customuser_id', 'from_customuser'
+        return Follow.objects.filter(**{match: user_id}).values(
+            'id', user_id=F(f'{other}_id'), username=F(f'{other}__username')
+        )
+
+    def list(self, request, *args, **kwargs):
+        if 'user_id' in kwargs and not User.objects.filter(id=kwargs['user_id']).exists():
+            return Response({'error': 'User not found'}, status=404)
+        return super().list(request, *args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,224 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Notification, NotificationOutbox
+from .hub import get_hub
+from . import unread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'notifications.dispatch.OutboxBackend'
+ACTOR_SAMPLE_SIZE = 5
+
+
+@dataclass(frozen=True)
+class NotificationEvent:
+    recipient_id: int
+    actor_id: int
+    verb: str
+    content_type_id: int = None
+    object_id: int = None
+
+
+def notify(recipient, actor, verb, target=None):
+    """Queue a notification for `recipient`; the configured backend decides when it is written."""
+    event = NotificationEvent(
+        recipient_id=recipient.pk,
+        actor_id=actor.pk,
+        verb=verb,
+        content_type_id=ContentType.objects.get_for_model(target).id if target is not None else None,
+        object_id=target.pk if target is not None else None,
+    )
+    get_backend().send([event])
+
+
+def aggregation_window():
+    # seconds during which repeated (recipient, verb, target) events fold into one row; 0 disables
+    return getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', 3600)
+
+
+def _group_key(n):
+    return (n.recipient_id, n.verb, n.content_type_id, n.object_id)
+
+
+def _add_actors(notification, actor_ids):
+    """Fold new actors into an existing row; actors already in the sample aren't counted twice."""
+    sample = list(notification.actor_sample)
+    for actor_id in actor_ids:
+        if actor_id in sample:
+            sample.remove(actor_id)
+        else:
+            notification.actor_count += 1
+        sample.append(actor_id)
+    notification.actor_sample = sample[-ACTOR_SAMPLE_SIZE:]
+    notification.actor_id = actor_ids[-1]  # the row shows the most recent actor
+
+
+def _open_groups(keys, since):
+    """Latest unread row per group key active since `since`, locked for update."""
+    condition = Q()
+    for recipient_id, verb, content_type_id, object_id in keys:
+        condition |= Q(recipient_id=recipient_id, verb=verb, content_type_id=content_type_id, object_id=object_id)
+    rows = (
+        Notification.objects.select_for_update()
+        .filter(condition, is_read=False, timestamp__gte=since)
+        .order_by('-timestamp', '-id')
+    )
+    groups = {}
+    for row in rows:
+        groups.setdefault(_group_key(row), row)
+    return groups
+
+
+@transaction.atomic
+def write_notifications(events):
+    """Write a batch of events, folding events on the same target into one row.
+
+    Events are grouped by (recipient, verb, target); a group either updates
+    the recipient's open (unread, within NOTIFICATION_AGGREGATION_WINDOW)
+    row in place or becomes one new row, so a viral post produces one
+    "alice and 41 others liked your post" row instead of 42.
+    """
+    groups = {}
+    for e in events:
+        actors = groups.setdefault(_group_key(e), [])
+        if e.actor_id in actors:
+            actors.remove(e.actor_id)
+        actors.append(e.actor_id)
+
+    now = timezone.now()
+    window = aggregation_window()
+    existing = _open_groups(groups, now - timedelta(seconds=window)) if window and groups else {}
+
+    updated, created = [], []
+    for key, actors in groups.items():
+        if key in existing:
+            _add_actors(existing[key], actors)
+            existing[key].timestamp = now  # a new actor brings the row back to the top of the list
+            updated.append(existing[key])
+        elif window:
+            recipient_id, verb, content_type_id, object_id = key
+            created.append(Notification(
+                recipient_id=recipient_id,
+                actor_id=actors[-1],
+                verb=verb,
+                content_type_id=content_type_id,
+                object_id=object_id,
+                actor_count=len(actors),
+                actor_sample=actors[-ACTOR_SAMPLE_SIZE:],
+            ))
+        else:
+            recipient_id, verb, content_type_id, object_id = key
+            created += [
+                Notification(recipient_id=recipient_id, actor_id=actor_id, verb=verb,
+                             content_type_id=content_type_id, object_id=object_id, actor_sample=[actor_id])
+                for actor_id in actors
+            ]
+
+    if updated:
+        Notification.objects.bulk_update(updated, ['actor', 'actor_count', 'actor_sample', 'timestamp'])
+    created = Notification.objects.bulk_create(created)
+    unread.invalidate(n.recipient_id for n in created)
+    written = created + updated
+    transaction.on_commit(lambda: _publish(written))
+    return written
+
+
+def _publish(notifications):
+    # wake any open notification streams of the recipients
+    hub = get_hub()
+    for n in notifications:
+        hub.publish(n.recipient_id, n.id)
+
+
+def drain(batch_size=500):
+    """Move up to `batch_size` outbox rows into notifications; returns how many were taken."""
+    with transaction.atomic():
+        rows = NotificationOutbox.objects.order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            rows = rows.select_for_update(skip_locked=True)  # lets several workers drain in parallel
+        rows = list(rows[:batch_size])
+        if rows:
+            write_notifications(rows)
+            NotificationOutbox.objects.filter(id__in=[r.id for r in rows]).delete()
+    return len(rows)
+
+
+class SyncBackend:
+    """Writes notifications inside the request, like the original views did."""
+
+    def send(self, events):
+        write_notifications(events)
+
+
+class OutboxBackend:
+    """Appends events to the outbox table and lets a small thread pool write them in batches.
+
+    The request only pays for one narrow INSERT; bursts (e.g. many likes on
+    one post) are coalesced because workers wait NOTIFICATION_FLUSH_DELAY
+    seconds before draining. Rows left behind by a crash are picked up by the
+    next wake-up or by `manage.py drain_notifications`.
+    """
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+        self.flush_delay = getattr(settings, 'NOTIFICATION_FLUSH_DELAY', 0.05)
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'NOTIFICATION_WORKERS', 1),
+            thread_name_prefix='notifications',
+        )
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def send(self, events):
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(
+                recipient_id=e.recipient_id,
+                actor_id=e.actor_id,
+                verb=e.verb,
+                content_type_id=e.content_type_id,
+                object_id=e.object_id,
+            )
+            for e in events
+        ])
+        transaction.on_commit(self.wake)  # workers must not see rows before they are committed
+
+    def wake(self):
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.executor.submit(self._run)
+
+    def _run(self):
+        time.sleep(self.flush_delay)
+        with self._lock:
+            self._scheduled = False  # anything queued from now on schedules another run
+        try:
+            while drain(self.batch_size) == self.batch_size:
+                pass
+        except Exception:
+            logger.exception('Failed to drain notification outbox')
+        finally:
+            connection.close()  # worker threads get their own connection
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    path = getattr(settings, 'NOTIFICATION_BACKEND', DEFAULT_BACKEND)
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_HUB = 'notifications.hub.InProcessHub'
+
+
+class InProcessHub:
+    """Pub/sub between notification writers and stream connections in one process.
+
+    Subscribers are asyncio queues owned by the event loop serving the
+    stream; `publish` can be called from any thread (request threads,
+    dispatch workers) and hands messages over with call_soon_threadsafe.
+    Deployments with several processes can swap in a backend built on
+    Postgres LISTEN/NOTIFY or Redis with the same two methods.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[user_id].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(entry)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, message):
+        with self._lock:
+            entries = list(self._subscribers.get(user_id, ()))
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass  # the loop is gone; the subscriber will be removed when its stream ends
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = import_string(getattr(settings, 'NOTIFICATION_HUB', DEFAULT_HUB))()
+        return _hub
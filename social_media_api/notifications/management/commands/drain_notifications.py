@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.dispatch import drain
+
+
+class Command(BaseCommand):
+    help = 'Write queued notifications from the outbox table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='keep polling instead of exiting when empty')
+        parser.add_argument('--interval', type=float, default=1.0, help='seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            taken = drain(options['batch_size'])
+            total += taken
+            if taken:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {total} queued notifications'))
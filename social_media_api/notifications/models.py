@@ -14,6 +14,32 @@ class Notification(models.Model):
     target = GenericForeignKey('content_type', 'object_id')  # points to any object (post, comment)
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # aggregation: one row stands for every actor that did `verb` to the same target in a window
+    actor_count = models.PositiveIntegerField(default=1)
+    actor_sample = models.JSONField(default=list, blank=True)  # a few recent actor ids, newest last
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_time_idx'),
+            models.Index(fields=['recipient', 'is_read', '-timestamp', '-id'], name='notif_unread_idx'),
+            models.Index(fields=['recipient', 'content_type', 'object_id', 'verb'], name='notif_group_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.actor} {self.verb} → {self.recipient}'
\ No newline at end of file
+        return f'{self.actor} {self.verb} → {self.recipient}'
+
+    @property
+    def summary(self):
+        others = self.actor_count - 1
+        if others <= 0:
+            return f'{self.actor.username} {self.verb}'
+        return f"{self.actor.username} and {others} {'other' if others == 1 else 'others'} {self.verb}"
+
+class NotificationOutbox(models.Model):
+    # durable queue of notifications waiting to be written by the dispatch workers
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=255)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+from accounts.authentication import CachedTokenAuthentication
+from .hub import get_hub
+from .models import Notification
+from .views import notification_data
+
+BATCH_SIZE = 50
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@sync_to_async
+def _authenticate(request):
+    # EventSource can't send headers, so the token may also come as ?token=
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):] if header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    except exceptions.AuthenticationFailed:
+        return None
+    return user
+
+
+@sync_to_async
+def _fetch(user, since, changed_ids=()):
+    """Notifications newer than `since`, plus rows updated in place (aggregation) since we last looked."""
+    rows = (
+        # pushed ids come from writes on the primary; a replica may not have them yet
+        Notification.objects.using(DEFAULT_DB_ALIAS).filter(Q(id__gt=since) | Q(id__in=changed_ids), recipient=user)
+        .select_related('actor')
+        .order_by('id')[:BATCH_SIZE]
+    )
+    return [notification_data(n) for n in rows]
+
+
+def _cursor(request):
+    value = request.GET.get('since') or request.headers.get('Last-Event-ID') or 0
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+
+def _drain(queue):
+    ids = set()
+    while not queue.empty():
+        ids.add(queue.get_nowait())
+    return ids
+
+
+def _sse(data, cursor):
+    # the event id is the resume cursor, not the row id: aggregated rows can be re-sent with older ids
+    return f"id: {cursor}\nevent: notification\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def _events(user, since):
+    heartbeat = _setting('NOTIFICATION_STREAM_HEARTBEAT', 15)
+    deadline = time.monotonic() + _setting('NOTIFICATION_STREAM_MAX_SECONDS', 300)
+    async with get_hub().subscribe(user.id) as queue:  # subscribe first so nothing slips in between
+        changed = set()
+        while True:
+            rows = await _fetch(user, since, changed)
+            for data in rows:
+                since = max(since, data['id'])
+                yield _sse(data, since)
+            if len(rows) == BATCH_SIZE:
+                changed -= {data['id'] for data in rows}
+                continue  # still catching up
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return  # the client reconnects with Last-Event-ID
+            try:
+                changed = {await asyncio.wait_for(queue.get(), min(heartbeat, remaining))}
+            except asyncio.TimeoutError:
+                changed = set()
+                yield ': keep-alive\n\n'
+                continue
+            changed |= _drain(queue)
+
+
+async def _long_poll(user, since, timeout):
+    async with get_hub().subscribe(user.id) as queue:
+        rows = await _fetch(user, since)
+        if not rows:
+            try:
+                changed = {await asyncio.wait_for(queue.get(), timeout)} | _drain(queue)
+            except asyncio.TimeoutError:
+                changed = set()
+            rows = await _fetch(user, since, changed)
+    since = max([since] + [data['id'] for data in rows])
+    return JsonResponse({'since': since, 'results': rows}, encoder=DjangoJSONEncoder)
+
+
+async def notification_stream(request):
+    """Push new notifications to the client as they are written.
+
+    Served as Server-Sent Events by default; `?poll=1` long-polls instead and
+    returns as soon as something arrives (or after `?timeout=` seconds).
+    `?since=<id>` (or the Last-Event-ID header) resumes after a notification.
+    An idle client is a parked coroutine on the ASGI server, not a query loop.
+
+    Under WSGI the response would be buffered until the stream ends, holding
+    a sync worker all the while, so SSE is refused and long-polls don't wait.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    since = _cursor(request)
+    asgi = isinstance(request, ASGIRequest)
+
+    if request.GET.get('poll') in ('1', 'true'):
+        try:
+            timeout = max(0, min(float(request.GET.get('timeout', 25)), 60))
+        except ValueError:
+            timeout = 25
+        return await _long_poll(user, since, timeout if asgi else 0)
+    if not asgi:
+        return JsonResponse(
+            {'detail': 'Live notifications need the ASGI server; poll with ?poll=1&since=<id> instead.'},
+            status=501,
+        )
+
+    response = StreamingHttpResponse(_events(user, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop proxies from buffering the stream
+    return response
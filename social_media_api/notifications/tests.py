@@ -1,3 +1,189 @@
-from django.test import TestCase
+import asyncio
+import time
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from request_budget.testing import QueryBudgetAssertions
+from posts.models import Post
+from social_media_api.query_plans import QueryPlanAssertions
+from . import unread
+from .dispatch import NotificationEvent, SyncBackend, drain, get_backend, notify, write_notifications
+from .hub import InProcessHub
+from .models import Notification, NotificationOutbox
 
-# Create your tests here.
+User = get_user_model()
+
+
+class DispatchTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        self.post = Post.objects.create(author=self.bob, title='hello', content='...')
+
+    @override_settings(NOTIFICATION_BACKEND='notifications.dispatch.OutboxBackend')
+    def test_outbox_is_drained_in_batches(self):
+        ContentType.objects.get_for_model(Post)  # cached per process in production
+        with self.assertNumQueries(1):  # the request only pays for the outbox insert
+            notify(self.bob, self.alice, 'liked your post', target=self.post)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+        self.assertEqual(drain(), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        notification = Notification.objects.get()
+        self.assertEqual((notification.recipient, notification.target), (self.bob, self.post))
+
+    @override_settings(NOTIFICATION_BACKEND='notifications.dispatch.SyncBackend')
+    def test_sync_backend_writes_immediately(self):
+        notify(self.bob, self.alice, 'liked your post', target=self.post)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertIsInstance(get_backend(), SyncBackend)
+
+    def test_duplicate_events_in_a_batch_coalesce(self):
+        event = NotificationEvent(self.bob.id, self.alice.id, 'liked your post')
+        write_notifications([event, event, event])
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class AggregationTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(4)]
+        self.post = Post.objects.create(author=self.author, title='viral', content='...')
+        self.ct = ContentType.objects.get_for_model(Post).id
+
+    def like(self, fan):
+        return NotificationEvent(self.author.id, fan.id, 'liked your post', self.ct, self.post.id)
+
+    def test_likes_on_one_post_fold_into_one_row(self):
+        write_notifications([self.like(f) for f in self.fans[:3]])
+        write_notifications([self.like(self.fans[3]), self.like(self.fans[0])])  # fan0 again: not recounted
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.actor, self.fans[0])
+        self.assertEqual(notification.summary, 'fan0 and 3 others liked your post')
+
+    def test_read_rows_start_a_new_group(self):
+        write_notifications([self.like(self.fans[0])])
+        Notification.objects.update(is_read=True)
+        write_notifications([self.like(self.fans[1])])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_new_actor_moves_the_group_to_the_top(self):
+        write_notifications([self.like(self.fans[0])])
+        comment = NotificationEvent(self.author.id, self.fans[1].id, 'commented on your post', self.ct, self.post.id)
+        write_notifications([comment])
+        write_notifications([self.like(self.fans[2])])
+
+        verbs = list(Notification.objects.order_by('-timestamp', '-id').values_list('verb', flat=True))
+        self.assertEqual(verbs, ['liked your post', 'commented on your post'])
+
+    @override_settings(NOTIFICATION_AGGREGATION_WINDOW=0)
+    def test_aggregation_can_be_disabled(self):
+        write_notifications([self.like(f) for f in self.fans])
+        self.assertEqual(Notification.objects.count(), 4)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATION_AGGREGATION_WINDOW=0)
+class NotificationApiTests(QueryBudgetAssertions, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='me', password='pass12345')
+        actors = User.objects.bulk_create([User(username=f'actor{i}') for i in range(12)])
+        write_notifications([NotificationEvent(self.user.id, a.id, 'followed you') for a in actors])
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def test_get_marks_only_the_returned_page_read(self):
+        with self.assertNumQueries(3):  # auth, page with actors, bounded UPDATE
+            response = self.client.get('/api/notifications/')
+        self.assertQueryBudget(response)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 2)
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data['unread_count'], 2)
+
+    def test_unread_count_is_cached_and_invalidated(self):
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data['unread_count'], 12)
+        with self.assertNumQueries(0):  # token and count are both cached
+            self.client.get('/api/notifications/unread_count/')
+
+        ids = list(Notification.objects.values_list('id', flat=True)[:3])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/notifications/read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data['marked_read'], 3)
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data['unread_count'], 9)
+
+    def test_unread_count_staleness_is_bounded_without_a_shared_cache(self):
+        self.assertLessEqual(unread.timeout(), 5)  # no REDIS_URL in tests
+        self.assertEqual(unread.unread_count(self.user), 12)
+        Notification.objects.update(is_read=True)  # marked read by another worker; our copy isn't cleared
+        self.assertEqual(unread.unread_count(self.user), 12)
+        later = time.time() + unread.timeout() + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(unread.unread_count(self.user), 0)
+
+    def test_mark_read_ignores_other_users_notifications(self):
+        other = User.objects.create(username='other')
+        write_notifications([NotificationEvent(other.id, self.user.id, 'followed you')])
+        foreign = Notification.objects.get(recipient=other)
+        response = self.client.post('/api/notifications/read/', {'ids': [foreign.id]}, format='json')
+        self.assertEqual(response.data['marked_read'], 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='me', password='pass12345')
+        self.actor = User.objects.create(username='actor')
+        self.token = Token.objects.create(user=self.user).key
+
+    def test_hub_delivers_to_subscribers_only(self):
+        hub = InProcessHub()
+
+        async def scenario():
+            async with hub.subscribe(self.user.id) as queue:
+                hub.publish(self.user.id, 1)
+                hub.publish(self.actor.id, 2)  # nobody listening
+                return await asyncio.wait_for(queue.get(), 1)
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertFalse(hub._subscribers)
+
+    async def test_long_poll_resumes_after_since(self):
+        first, second = await sync_to_async(write_notifications)([
+            NotificationEvent(self.user.id, self.actor.id, 'followed you'),
+            NotificationEvent(self.user.id, self.actor.id, 'liked your post', object_id=1),
+        ])
+        response = await self.async_client.get(
+            '/api/notifications/stream/', {'poll': 1, 'since': first.id, 'token': self.token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([n['id'] for n in response.json()['results']], [second.id])
+        self.assertEqual(response.json()['since'], second.id)
+
+    def test_wsgi_refuses_sse_and_polls_without_waiting(self):
+        response = self.client.get('/api/notifications/stream/', {'token': self.token})
+        self.assertEqual(response.status_code, 501)
+        self.assertIn('?poll=1', response.json()['detail'])
+
+        started = time.monotonic()
+        response = self.client.get('/api/notifications/stream/', {'poll': 1, 'timeout': 30, 'token': self.token})
+        self.assertEqual((response.status_code, response.json()['results']), (200, []))
+        self.assertLess(time.monotonic() - started, 5)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+
+
+class IndexPlanTests(QueryPlanAssertions, TestCase):
+    def test_recipient_queries(self):
+        user = User.objects.create_user(username='bob', password='pass12345')
+        latest = Notification.objects.filter(recipient=user).order_by('-timestamp', '-id')
+        self.assertIndexed(latest[:11], 'notif_recipient_time_idx')
+        self.assertIndexed(latest.filter(is_read=False)[:11])
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from .models import Notification
+
+
+def timeout():
+    # invalidate() only reaches the cache it runs against; with a per-process cache
+    # this is how long another worker can show a stale count
+    return getattr(settings, 'UNREAD_COUNT_CACHE_TTL', 5)
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user):
+    """Unread notifications for `user`, served from the cache when possible."""
+    count = cache.get(_key(user.id))
+    if count is None:
+        # from the primary: a lagging replica read just after invalidate() would be cached for the whole TTL
+        count = Notification.objects.using(DEFAULT_DB_ALIAS).filter(recipient=user, is_read=False).count()
+        cache.set(_key(user.id), count, timeout())
+    return count
+
+
+def invalidate(user_ids):
+    keys = [_key(uid) for uid in set(user_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def mark_read(user, ids):
+    """Mark the given notifications of `user` as read; returns how many changed."""
+    updated = Notification.objects.filter(recipient=user, id__in=ids, is_read=False).update(is_read=True)
+    if updated:
+        invalidate([user.id])
+    return updated
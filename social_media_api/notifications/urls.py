@@ -1,6 +1,10 @@
 from django.urls import path
-from .views import get_notifications
+from .views import get_notifications, unread_count, mark_read
+from .stream import notification_stream
 
 urlpatterns = [
     path('', get_notifications),
-]
\ No newline at end of file
+    path('unread_count/', unread_count),
+    path('read/', mark_read),
+    path('stream/', notification_stream),
+]
@@ -1,27 +1,52 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from social_media_api.pagination import KeysetPagination
 from .models import Notification
+from . import unread
+
+MAX_MARK_READ = 500
+
+def notification_data(n):
+    return {
+        'id': n.id,
+        'actor': n.actor.username,
+        'verb': n.verb,
+        'actor_count': n.actor_count,
+        'summary': n.summary,
+        'is_read': n.is_read,
+        'timestamp': n.timestamp,
+    }
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_notifications(request):
     notifications = Notification.objects.filter(
         recipient=request.user
-    ).order_by('-timestamp')
-    
-    data = [
-        {
-            'id': n.id,
-            'actor': n.actor.username,
-            'verb': n.verb,
-            'is_read': n.is_read,
-            'timestamp': n.timestamp,
-        }
-        for n in notifications
-    ]
-    
-    # mark all as read after fetching
-    notifications.update(is_read=True)
-    
-    return Response(data)
\ No newline at end of file
+    ).select_related('actor')
+    if request.query_params.get('unread') in ('1', 'true'):
+        notifications = notifications.filter(is_read=False)
+    paginator = KeysetPagination(ordering=('-timestamp', '-id'))
+    page = paginator.paginate_queryset(notifications, request)
+
+    data = [notification_data(n) for n in page]
+
+    # mark only the notifications we just returned as read
+    unread.mark_read(request.user, [n.id for n in page if not n.is_read])
+
+    return paginator.get_paginated_response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread_count(request):
+    return Response({'unread_count': unread.unread_count(request.user)})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_read(request):
+    ids = request.data.get('ids')
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return Response({'error': 'ids must be a list of notification ids'}, status=400)
+    if len(ids) > MAX_MARK_READ:
+        return Response({'error': f'At most {MAX_MARK_READ} ids per request'}, status=400)
+    return Response({'marked_read': unread.mark_read(request.user, ids)})
@@ -0,0 +1,35 @@
+"""Response-cache generations for posts and comments (see social_media_api.response_cache).
+
+Post lists nest comments and counters, so anything touching a post, its
+comments or its likes retires that post's detail and the list pages showing
+it. A list page records its posts' generations instead of depending on all
+of them; the 'posts' generation only moves when which posts a page or search
+shows can change: a post is created, edited or deleted.
+"""
+from social_media_api import response_cache
+
+
+def post_generations(post_id=None):
+    return ['posts'] if post_id is None else [f'post:{post_id}']
+
+
+def comment_generations(comment_id=None):
+    return ['comments'] if comment_id is None else [f'comment:{comment_id}']
+
+
+def page_generations(data):
+    return [f'post:{post["id"]}' for post in data['results']]
+
+
+def post_changed(post_id):
+    response_cache.bump_members(f'post:{post_id}')
+
+
+def post_saved(post_id):
+    response_cache.bump('posts')
+    post_changed(post_id)
+
+
+def comment_changed(comment_id, post_id):
+    response_cache.bump('comments', f'comment:{comment_id}')
+    post_changed(post_id)
@@ -0,0 +1,37 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def count_of(model, fk):
+    """Correlated subquery counting `model` rows pointing at the outer row through `fk`."""
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    return Coalesce(Subquery(rows.annotate(n=Count('*')).values('n')), 0)
+
+
+def reconcile(queryset, field, actual, dry_run=False):
+    """Rewrite `field` wherever it differs from `actual`; returns how many rows drifted."""
+    drifted = list(
+        queryset.annotate(actual=actual).exclude(**{field: F('actual')}).values_list('pk', flat=True)
+    )
+    if not dry_run:
+        for i in range(0, len(drifted), BATCH_SIZE):
+            queryset.filter(pk__in=drifted[i:i + BATCH_SIZE]).update(**{field: actual})
+    return len(drifted)
+
+
+def post_counters(Post, Like, Comment):
+    return {
+        'like_count': count_of(Like, 'post'),
+        'comment_count': count_of(Comment, 'post'),
+    }
+
+
+def user_counters(User):
+    through = User.followers.through  # from_<user> is followed by to_<user>
+    name = User._meta.model_name
+    return {
+        'follower_count': count_of(through, f'from_{name}'),
+        'following_count': count_of(through, f'to_{name}'),
+    }
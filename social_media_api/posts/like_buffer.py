@@ -0,0 +1,275 @@
+"""Optional write-behind buffer for likes on hot posts.
+
+A viral post turns every like into a fight over the same Post row and Like
+index page. Once a post receives LIKE_BUFFER_HOT_RATE likes/unlikes per
+second in this process, further intents are appended to a local journal,
+kept in memory, and written every LIKE_BUFFER_FLUSH_MS in one transaction
+per post. That means one row lock and one counter update per batch instead
+of one per like.
+
+Intents are "ensure liked" / "ensure not liked", so replaying them is
+idempotent. Each process appends to its own journal file and holds an
+flock on it. Files whose owner died are replayed by the next flush thread
+to start. The acting process folds its pending intents into like/unlike
+responses and post reads, so a user always sees their own like. Other
+processes see it after the flush.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from . import cache, trending
+from .models import Post, Like
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so journals can't be claimed safely and the buffer stays off
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Journal:
+    """Append-only JSONL of [user_id, post_id, intent] records."""
+
+    def __init__(self, directory, fsync=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+        self._file = self._open()
+
+    def _open(self):
+        path = os.path.join(self.directory, f'likes-{os.getpid()}-{uuid.uuid4().hex}.jsonl')
+        journal = open(path, 'a', encoding='utf-8')
+        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)  # held while the file is live
+        return journal
+
+    def append(self, user_id, post_id, intent):
+        self._file.write(json.dumps([user_id, post_id, intent]) + '\n')
+        self._file.flush()  # survives a process crash; LIKE_BUFFER_FSYNC also survives power loss
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def rotate(self):
+        """Start a new file and return the old one, to be discarded once its intents are committed."""
+        old, self._file = self._file, self._open()
+        return old
+
+    @staticmethod
+    def discard(journal):
+        os.unlink(journal.name)
+        journal.close()
+
+    @staticmethod
+    def read(journal):
+        journal.seek(0)
+        records = []
+        for line in journal:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass  # torn last line from a crash mid-write
+        return records
+
+    def orphans(self):
+        """Journal files no live process holds; yielded locked, so only one process replays each."""
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.jsonl') or path == self._file.name:
+                continue
+            try:
+                journal = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                journal.close()
+                continue
+            if not os.path.exists(path):  # replayed and removed while we waited for the lock
+                journal.close()
+                continue
+            yield journal
+
+
+def write_intents(intents):
+    """Apply {post_id: {user_id: +1 | -1}}; one transaction and one counter update per post."""
+    for post_id, by_user in intents.items():
+        with transaction.atomic():
+            if not Post.objects.select_for_update().filter(pk=post_id).exists():
+                continue  # deleted since; its likes went with it
+            existing = dict(
+                Like.objects.filter(post_id=post_id, user_id__in=list(by_user)).values_list('user_id', 'created_at')
+            )
+            added = [uid for uid, intent in by_user.items() if intent > 0 and uid not in existing]
+            removed = [uid for uid, intent in by_user.items() if intent < 0 and uid in existing]
+            Like.objects.bulk_create([Like(user_id=uid, post_id=post_id) for uid in added], ignore_conflicts=True)
+            if removed:
+                Like.objects.filter(post_id=post_id, user_id__in=removed).delete()
+            if added or removed:
+                weight = trending.weights()['like']
+                # an unlike takes back what its like added when it was made
+                events = [(weight, None)] * len(added) + [(-weight, existing[uid]) for uid in removed]
+                Post.objects.filter(pk=post_id).update(
+                    like_count=F('like_count') + len(added) - len(removed),
+                    **trending.update_expressions(events),
+                )
+                cache.post_changed(post_id)
+
+
+class LikeBuffer:
+    def __init__(self, journal, flush_interval, hot_rate):
+        self.journal = journal
+        self.flush_interval = flush_interval
+        self.hot_rate = hot_rate
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(dict)  # post_id -> {user_id: +1 | -1}, newest intent wins
+        self._delta = defaultdict(int)  # post_id -> like_count change not yet in the database
+        self._inflight = ({}, {})  # (intents, deltas) being written by the current flush
+        self._unflushed = []  # rotated journal files whose intents aren't committed yet
+        self._rate = {}  # post_id -> (second, intents seen in it)
+        self._thread = None
+        atexit.register(self.flush)
+
+    def is_hot(self, post_id):
+        """Count an intent for `post_id` and say whether it should go through the buffer."""
+        now = int(time.monotonic())
+        with self._lock:
+            second, count = self._rate.get(post_id, (now, 0))
+            count = count + 1 if second == now else 1
+            if len(self._rate) > 10000:
+                self._rate = {pid: seen for pid, seen in self._rate.items() if seen[0] == now}
+            self._rate[post_id] = (now, count)
+            # posts with buffered intents stay buffered so intents apply in order
+            return count >= self.hot_rate or post_id in self._pending or post_id in self._inflight[0]
+
+    def _intent(self, user_id, post_id):
+        intent = self._pending.get(post_id, {}).get(user_id)
+        if intent is None:
+            intent = self._inflight[0].get(post_id, {}).get(user_id)
+        return intent
+
+    def delta(self, post_id):
+        with self._lock:
+            return self._buffered_delta(post_id)
+
+    def _buffered_delta(self, post_id):
+        return self._delta.get(post_id, 0) + self._inflight[1].get(post_id, 0)
+
+    def toggle(self, user_id, post_id, intent):
+        """Buffered counterpart of posts.likes.like/unlike: (changed, like_count, author_id) or None."""
+        # read under the flush lock: a flush committing between these reads and the
+        # buffer check would drop the intent they are compared with and leave the rows stale
+        with self._flush_lock:
+            post = Post.objects.filter(pk=post_id).values_list('like_count', 'author_id').first()
+            if post is None:
+                return None
+            liked_in_db = Like.objects.filter(user_id=user_id, post_id=post_id).exists()
+            with self._lock:
+                current = self._intent(user_id, post_id)
+                liked = current > 0 if current is not None else liked_in_db
+                changed = liked != (intent > 0)
+                if changed:
+                    self.journal.append(user_id, post_id, intent)
+                    self._pending[post_id][user_id] = intent
+                    self._delta[post_id] += intent
+                like_count = post[0] + self._buffered_delta(post_id)
+        self._start()
+        return changed, like_count, post[1]
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of intents written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight = (self._pending, self._delta)
+                self._pending, self._delta = defaultdict(dict), defaultdict(int)
+                self._unflushed.append(self.journal.rotate())
+            intents, deltas = self._inflight
+            try:
+                write_intents(intents)
+            except Exception:
+                logger.exception('like buffer flush failed; keeping %d posts buffered', len(intents))
+                with self._lock:
+                    for post_id, by_user in intents.items():
+                        for user_id, intent in by_user.items():
+                            self._pending[post_id].setdefault(user_id, intent)
+                        self._delta[post_id] += deltas.get(post_id, 0)
+                    self._inflight = ({}, {})
+                return 0
+            with self._lock:
+                self._inflight = ({}, {})
+                unflushed, self._unflushed = self._unflushed, []
+            for journal in unflushed:
+                Journal.discard(journal)
+            return sum(len(by_user) for by_user in intents.values())
+
+    def recover(self):
+        """Replay journals left by processes that died before flushing."""
+        replayed = 0
+        for journal in self.journal.orphans():
+            intents = defaultdict(dict)
+            for user_id, post_id, intent in Journal.read(journal):
+                intents[post_id][user_id] = intent  # later lines win
+            write_intents(intents)
+            Journal.discard(journal)
+            replayed += sum(len(by_user) for by_user in intents.values())
+        if replayed:
+            logger.warning('replayed %d buffered like intents from crashed processes', replayed)
+        return replayed
+
+    def _start(self):
+        if not self.flush_interval or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='like-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception:
+            logger.exception('like journal recovery failed')
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_unsupported_logged = False
+
+
+def get_buffer():
+    """The process-wide buffer, or None when LIKE_BUFFER_ENABLED is off or the platform has no fcntl."""
+    global _buffer, _unsupported_logged
+    if not _setting('LIKE_BUFFER_ENABLED', False):
+        return None
+    with _buffer_lock:
+        if fcntl is None:
+            if not _unsupported_logged:
+                logger.warning('LIKE_BUFFER_ENABLED is set but fcntl is unavailable; likes are written directly')
+                _unsupported_logged = True
+            return None
+        if _buffer is None:
+            _buffer = LikeBuffer(
+                Journal(_setting('LIKE_BUFFER_JOURNAL_DIR', 'like_journal'), fsync=_setting('LIKE_BUFFER_FSYNC', False)),
+                flush_interval=_setting('LIKE_BUFFER_FLUSH_MS', 200) / 1000,
+                hot_rate=_setting('LIKE_BUFFER_HOT_RATE', 20),
+            )
+        return _buffer
@@ -0,0 +1,147 @@
+"""Like as one (PostgreSQL) or two (SQLite) statements, unlike as two.
+
+Each call returns (changed, like_count, author_id), or None when the post
+does not exist. The insert is keyed on the (user, post) unique constraint,
+so a repeated like is a no-op instead of an IntegrityError, and the counter
+update returns the new count so no extra SELECT is needed. Hot posts go
+through the write-behind buffer instead when it is enabled (see like_buffer).
+"""
+from datetime import timezone as dt_timezone
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from social_media_api import db_router
+from . import cache, trending
+from .like_buffer import get_buffer
+from .models import Post, Like
+
+POST = Post._meta.db_table
+LIKE = Like._meta.db_table
+
+# {trending} is filled in with trending.update_sql(); all params are %(name)s
+_PG_LIKE = f"""
+WITH ins AS (
+    INSERT INTO {LIKE} (user_id, post_id, created_at)
+    SELECT %(user)s, id, %(now)s FROM {POST} WHERE id = %(post)s
+    ON CONFLICT (user_id, post_id) DO NOTHING
+    RETURNING post_id
+), upd AS (
+    UPDATE {POST} SET like_count = like_count + 1, {{trending}}
+    WHERE id IN (SELECT post_id FROM ins)
+    RETURNING like_count, author_id
+)
+SELECT true, like_count, author_id FROM upd
+UNION ALL
+SELECT false, like_count, author_id FROM {POST}
+WHERE id = %(post)s AND NOT EXISTS (SELECT 1 FROM upd)
+"""
+
+# SQLite has RETURNING (3.35+) but no data-modifying CTEs, so the write and the
+# counter update are two statements; the update always runs and reports the count.
+_SQLITE_LIKE = f"""
+INSERT INTO {LIKE} (user_id, post_id, created_at)
+SELECT %(user)s, id, %(now)s FROM {POST} WHERE id = %(post)s
+ON CONFLICT (user_id, post_id) DO NOTHING
+"""
+# An unlike takes back the score its like added, which depends on when the like
+# was made; the DELETE returns that, so unlikes are two statements on both databases.
+_UNLIKE = f"DELETE FROM {LIKE} WHERE user_id = %(user)s AND post_id = %(post)s RETURNING created_at"
+_COUNT = (
+    f"UPDATE {POST} SET like_count = like_count + %(delta)s, {{trending}} "
+    "WHERE id = %(post)s RETURNING like_count, author_id"
+)
+
+
+def _params(user_id, post_id, now):
+    return {'user': user_id, 'post': post_id, 'now': connection.ops.adapt_datetimefield_value(now)}
+
+
+def _liked_at(value):
+    # raw cursors on SQLite return the stored text, which is UTC
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return timezone.make_aware(value, dt_timezone.utc) if timezone.is_naive(value) else value
+
+
+def _counter_update(sql, delta, params, events):
+    """Fill in the trending fragment for a like_count change of `delta` made by trending `events`."""
+    trending_sql, trending_params = trending.update_sql(events)
+    return sql.format(trending=trending_sql), {**params, **trending_params, 'delta': delta}
+
+
+def _single_statement(user_id, post_id):
+    now = timezone.now()
+    sql, params = _counter_update(_PG_LIKE, 1, _params(user_id, post_id, now), [(trending.weights()['like'], now)])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return (bool(row[0]), row[1], row[2]) if row else None
+
+
+def _two_statements(write_sql, user_id, post_id, delta):
+    now = timezone.now()
+    params = _params(user_id, post_id, now)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(write_sql, params)
+        if delta > 0:
+            liked_at = now if cursor.rowcount == 1 else None
+        else:
+            deleted = cursor.fetchone()
+            liked_at = _liked_at(deleted[0]) if deleted else None
+        changed = liked_at is not None
+        events = [(delta * trending.weights()['like'], liked_at)] if changed else []
+        cursor.execute(*_counter_update(_COUNT, delta if changed else 0, params, events))
+        row = cursor.fetchone()
+    return (changed, row[0], row[1]) if row else None
+
+
+def _orm(user_id, post_id, delta):
+    # databases without RETURNING (MySQL): the original ORM path
+    with transaction.atomic():
+        post = Post.objects.select_for_update().filter(pk=post_id).values('like_count', 'author_id').first()
+        if post is None:
+            return None
+        if delta > 0:
+            like, changed = Like.objects.get_or_create(user_id=user_id, post_id=post_id)
+        else:
+            like = Like.objects.filter(user_id=user_id, post_id=post_id).first()
+            changed = like is not None and like.delete()[0] > 0
+        if changed:
+            Post.objects.filter(pk=post_id).update(
+                like_count=F('like_count') + delta,
+                **trending.update_expressions([(delta * trending.weights()['like'], like.created_at)]),
+            )
+        return changed, post['like_count'] + (delta if changed else 0), post['author_id']
+
+
+def _buffered(post_id):
+    buffer = get_buffer()
+    return buffer if buffer is not None and buffer.is_hot(post_id) else None
+
+
+def _toggle(user_id, post_id, delta, write_sql):
+    buffer = _buffered(post_id)
+    if buffer is not None:
+        result = buffer.toggle(user_id, post_id, delta)  # cached responses are retired when it flushes
+        if result is not None and result[0]:
+            db_router.wrote()  # the flush lands on the primary before replicas
+        return result
+    if connection.vendor == 'postgresql' and delta > 0:
+        result = _single_statement(user_id, post_id)
+    elif connection.vendor in ('postgresql', 'sqlite'):
+        result = _two_statements(write_sql, user_id, post_id, delta)
+    else:
+        result = _orm(user_id, post_id, delta)
+    if result is not None and result[0]:
+        db_router.wrote()  # raw SQL doesn't pass through the router
+        cache.post_changed(post_id)
+    return result
+
+
+def like(user_id, post_id):
+    return _toggle(user_id, post_id, 1, _SQLITE_LIKE)
+
+
+def unlike(user_id, post_id):
+    return _toggle(user_id, post_id, -1, _UNLIKE)
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized home timelines from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='only rebuild these user ids (repeatable)')
+        parser.add_argument('--trim', action='store_true',
+                            help='only cut timelines down to FEED_TIMELINE_LIMIT entries; run it periodically')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        if options['trim']:
+            deleted = timeline.trim_timelines(users.values_list('id', flat=True).iterator())
+            self.stdout.write(self.style.SUCCESS(f'Trimmed {deleted} timeline entries'))
+            return
+        count = 0
+        for user in users.iterator():
+            timeline.rebuild_timeline(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} timelines'))
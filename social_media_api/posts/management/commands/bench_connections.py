@@ -0,0 +1,87 @@
+import copy
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from posts.management.commands.bench_likes import percentile
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency with reconnecting, persistent and pooled database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='requests per worker thread')
+        parser.add_argument('--threads', type=int, default=4)
+
+    def _modes(self, configured):
+        reconnect = {**copy.deepcopy(configured), 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+        reconnect['OPTIONS'].pop('pool', None)
+        persistent = {**copy.deepcopy(reconnect), 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}
+        modes = [('reconnect', reconnect), ('persistent', persistent)]
+        if connection.vendor == 'postgresql':
+            try:
+                import psycopg_pool  # noqa: F401
+            except ImportError:
+                self.stderr.write('psycopg_pool is not installed; skipping the pool row')
+            else:
+                pooled = copy.deepcopy(reconnect)
+                pooled['OPTIONS']['pool'] = configured['OPTIONS'].get('pool') or {'min_size': 2, 'max_size': 10}
+                modes.append(('pool', pooled))
+        return modes
+
+    def _run(self, requests, threads):
+        """Each worker thread serves `requests` requests like a WSGI worker thread would."""
+        timings, connects = [], []
+        lock = threading.Lock()
+
+        def count_connect(sender, **kwargs):
+            with lock:
+                connects.append(1)
+
+        def worker():
+            local = []
+            for i in range(requests):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)  # close_old_connections(), as in a real request
+                Post.objects.filter(pk=i).exists()
+                request_finished.send(sender=self.__class__)
+                local.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                timings.extend(local)
+
+        connection_created.connect(count_connect)
+        try:
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            return time.perf_counter() - started, timings, len(connects)
+        finally:
+            connection_created.disconnect(count_connect)
+
+    def handle(self, *args, **options):
+        configured = connections.settings['default']
+        saved = copy.deepcopy(configured)
+        self.stdout.write(f"{'mode':<12}{'req/s':>9}{'connects':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        try:
+            for name, settings_dict in self._modes(saved):
+                connection.close()
+                configured.clear()
+                configured.update(settings_dict)  # shared by the per-thread connection wrappers
+                wall, timings, connects = self._run(options['requests'], options['threads'])
+                if settings_dict['OPTIONS'].get('pool'):
+                    connection.close_pool()
+                self.stdout.write(
+                    f'{name:<12}{len(timings) / wall:>9.0f}{connects:>10}'
+                    f'{percentile(timings, 0.5) * 1000:>9.3f}{percentile(timings, 0.99) * 1000:>9.3f}'
+                )
+        finally:
+            connection.close()
+            configured.clear()
+            configured.update(saved)
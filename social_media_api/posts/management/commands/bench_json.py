@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+import uuid
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from social_media_api import renderers
+from social_media_api.renderers import ORJSONParser, ORJSONRenderer
+from posts.models import Post, Comment
+from posts.serializers import PostSerializer
+
+User = get_user_model()
+
+
+def measure(func, repeat):
+    """(ms per call, peak KiB traced during a call, KiB still held by its result)."""
+    func()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    _ = func()  # kept alive so `current` is the size of the output
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024, current / 1024
+
+
+class Command(BaseCommand):
+    help = 'Compare stdlib json and orjson rendering/parsing of a page of PostSerializer payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100, help='posts in the payload')
+        parser.add_argument('--comments', type=int, default=5, help='comments per post')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stderr.write('orjson is not installed; the orjson rows fall back to stdlib json')
+        tag = uuid.uuid4().hex[:8]
+        author = User.objects.create(username=f'bench-{tag}', password='!')
+        posts = Post.objects.bulk_create(
+            Post(author=author, title=f'post {i} ✓', content='lorem ipsum dolor sit amet ' * 20)
+            for i in range(options['posts'])
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=author, content=f'comment {j} on {post.pk}')
+            for post in posts for j in range(options['comments'])
+        )
+        try:
+            queryset = Post.objects.filter(author=author).select_related('author').prefetch_related(
+                'comments__author'
+            )
+            data = {'next': None, 'results': PostSerializer(queryset, many=True).data}
+            body = JSONRenderer().render(data)
+            self.stdout.write(f'payload: {len(body) / 1024:.0f} KiB, {options["repeat"]} runs each')
+            self.stdout.write(f"{'step':<18}{'ms':>9}{'peak KiB':>10}{'result KiB':>12}")
+            steps = (
+                ('render stdlib', lambda: JSONRenderer().render(data)),
+                ('render orjson', lambda: ORJSONRenderer().render(data)),
+                ('parse stdlib', lambda: JSONParser().parse(BytesIO(body))),
+                ('parse orjson', lambda: ORJSONParser().parse(BytesIO(body))),
+            )
+            for name, func in steps:
+                ms, peak, result = measure(func, options['repeat'])
+                self.stdout.write(f'{name:<18}{ms:>9.3f}{peak:>10.0f}{result:>12.0f}')
+            if ORJSONRenderer().render(data) != body:
+                self.stderr.write('orjson output differs from JSONRenderer output')
+        finally:
+            author.delete()
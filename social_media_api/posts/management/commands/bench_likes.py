@@ -0,0 +1,101 @@
+import tempfile
+import threading
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from posts import likes
+from posts.like_buffer import Journal, LikeBuffer
+from posts.models import Post, Like
+
+User = get_user_model()
+
+
+def orm_like(user_id, post_id):
+    # the previous view: fetch the post, get_or_create the like, bump the counter
+    post = Post.objects.get(pk=post_id)
+    with transaction.atomic():
+        _, created = Like.objects.get_or_create(user_id=user_id, post_id=post.pk)
+        if created:
+            Post.objects.filter(pk=post.pk).update(like_count=F('like_count') + 1)
+    return created
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0
+
+
+class Command(BaseCommand):
+    help = 'Compare round trips and latency of the like path against the old ORM path on one hot post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500, help='distinct likers')
+        parser.add_argument('--threads', type=int, default=8)
+
+    def _run(self, like, user_ids, post_id, threads):
+        timings, queries, errors = [], [], []
+        lock = threading.Lock()
+
+        def worker(chunk):
+            try:
+                for uid in chunk:
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        try:
+                            like(uid, post_id)
+                        except Exception as exc:  # e.g. "database is locked" on SQLite
+                            with lock:
+                                errors.append(exc)
+                            continue
+                        elapsed = time.perf_counter() - started
+                    with lock:
+                        timings.append(elapsed)
+                        queries.append(len(ctx))
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker, args=(user_ids[i::threads],)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return time.perf_counter() - started, timings, queries, errors
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            User(username=f'bench-{tag}-{i}', password='!') for i in range(options['users'] + 1)
+        )
+        author, likers = users[0], [u.id for u in users[1:]]
+        post = Post.objects.create(author=author, title='bench', content='hot post')
+        journal_dir = tempfile.TemporaryDirectory()
+        buffer = LikeBuffer(Journal(journal_dir.name), flush_interval=0.2, hot_rate=0)
+        paths = (
+            ('orm', orm_like),
+            ('single-statement', likes.like),
+            ('write-behind', lambda uid, pid: buffer.toggle(uid, pid, 1)),
+        )
+        try:
+            self.stdout.write(f"{'path':<18}{'likes/s':>10}{'queries':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+            for name, like in paths:
+                Like.objects.filter(post=post).delete()
+                Post.objects.filter(pk=post.pk).update(like_count=0)
+                wall, timings, queries, errors = self._run(like, likers, post.id, options['threads'])
+                buffer.flush()  # no-op for the direct paths
+                self.stdout.write(
+                    f'{name:<18}{len(timings) / wall:>10.0f}{sum(queries) / max(len(queries), 1):>9.1f}'
+                    f'{percentile(timings, 0.5) * 1000:>9.2f}{percentile(timings, 0.99) * 1000:>9.2f}'
+                    f'{len(errors):>8}'
+                )
+                post.refresh_from_db()
+                if post.like_count != len(timings):
+                    self.stderr.write(f'{name}: like_count {post.like_count} != {len(timings)} successful likes')
+        finally:
+            journal_dir.cleanup()
+            post.delete()
+            User.objects.filter(username__startswith=f'bench-{tag}-').delete()
@@ -0,0 +1,178 @@
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from posts.management.commands.bench_likes import percentile
+
+DEFAULT_MIX = 'feed=30,posts=15,like=20,comment=10,notifications=15,follow=10'
+
+
+class Client:
+    """One keep-alive HTTP connection acting as a random seeded user."""
+
+    def __init__(self, url, seed, rng):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip('/')
+        self.seed = seed
+        self.rng = rng
+
+    def request(self, method, path, body=None):
+        _, token = self.rng.choice(self.seed['user_tokens'])
+        headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, self.prefix + path, body, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()  # reconnects on the next request
+            return None
+        return response.status
+
+    def post_id(self):
+        return self.rng.choice(self.seed['post_ids'])
+
+    def user_id(self):
+        return self.rng.choice(self.seed['user_tokens'])[0]
+
+    # one method per entry in the mix; each returns the response status
+    def feed(self):
+        return self.request('GET', '/api/feed/')
+
+    def posts(self):
+        return self.request('GET', '/api/posts/')
+
+    def like(self):
+        return self.request('POST', f"/api/{self.post_id()}/{self.rng.choice(['like', 'unlike'])}/")
+
+    def comment(self):
+        return self.request('POST', '/api/comments/', {'post': self.post_id(), 'content': 'load test comment'})
+
+    def notifications(self):
+        return self.request('GET', '/api/notifications/')
+
+    def follow(self):
+        action = self.rng.choice(['follow', 'unfollow'])
+        return self.request('POST', f'/api/accounts/{action}/{self.user_id()}/')
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(Client, name.strip()) or not weight.strip().isdigit():
+            raise CommandError(f'bad --mix entry {part!r}; use name=weight with names from {DEFAULT_MIX}')
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+def summarize(timings, errors, wall):
+    return {
+        'requests': len(timings),
+        'rps': len(timings) / wall,
+        'p50': percentile(timings, 0.5) * 1000,
+        'p95': percentile(timings, 0.95) * 1000,
+        'p99': percentile(timings, 0.99) * 1000,
+        'errors': errors[0],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Drive a running server with a weighted mix of API calls and report throughput and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--seed-file', default='load_seed.json', help='written by seed_load')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='seconds')
+        parser.add_argument('--mix', default=DEFAULT_MIX)
+        parser.add_argument('--save', help='write the results as JSON (a baseline for --compare)')
+        parser.add_argument('--compare', help='fail if p95 regresses against this saved run')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 regression for --compare')
+
+    def _run(self, client, names, weights, deadline, results, lock):
+        local = defaultdict(lambda: ([], [0]))
+        while time.monotonic() < deadline:
+            name = client.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            status = getattr(client, name)()
+            elapsed = time.perf_counter() - started
+            timings, errors = local[name]
+            timings.append(elapsed)
+            # 4xx from like/follow races (already liked, follow self) are fine; no answer or 5xx is not
+            if status is None or status >= 500 or status in (401, 403, 404):
+                errors[0] += 1
+        client.connection.close()
+        with lock:
+            for name, (timings, errors) in local.items():
+                results[name][0].extend(timings)
+                results[name][1][0] += errors[0]
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['seed_file']) as f:
+                seed = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"{options['seed_file']} not found; run seed_load first")
+        seed['user_tokens'] = [(int(uid), key) for uid, key in seed['tokens'].items()]
+        mix = parse_mix(options['mix'])
+        names, weights = list(mix), list(mix.values())
+
+        results = defaultdict(lambda: ([], [0]))
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+        threads = [
+            threading.Thread(target=self._run, args=(
+                Client(options['url'], seed, random.Random(i)), names, weights, deadline, results, lock,
+            ))
+            for i in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        rows = {name: summarize(*results[name], wall) for name in names}
+        rows['total'] = summarize(
+            [t for timings, _ in results.values() for t in timings],
+            [sum(errors[0] for _, errors in results.values())],
+            wall,
+        )
+        self.report(rows)
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(rows, f, indent=2)
+        if options['compare']:
+            self.compare(rows, options['compare'], options['tolerance'])
+
+    def report(self, rows):
+        self.stdout.write(f"{'endpoint':<15}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name, row in rows.items():
+            self.stdout.write(
+                f"{name:<15}{row['requests']:>9}{row['rps']:>9.1f}{row['p50']:>9.1f}{row['p95']:>9.1f}"
+                f"{row['p99']:>9.1f}{row['errors']:>8}"
+            )
+
+    def compare(self, rows, path, tolerance):
+        with open(path) as f:
+            baseline = json.load(f)
+        regressed = [
+            f"{name}: p95 {row['p95']:.1f}ms vs {baseline[name]['p95']:.1f}ms"
+            for name, row in rows.items()
+            if name in baseline and row['requests'] and row['p95'] > baseline[name]['p95'] * (1 + tolerance)
+        ]
+        if rows['total']['errors']:
+            regressed.append(f"{rows['total']['errors']} failed requests")
+        if regressed:
+            raise CommandError('regressed against ' + path + ':\n  ' + '\n  '.join(regressed))
+        self.stdout.write(self.style.SUCCESS(f'within {tolerance:.0%} of {path}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from posts.models import Post
+from posts.trending import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Re-seed trending scores of recent posts from their like/comment counters'
+
+    def handle(self, *args, **options):
+        count = rebuild(Post)
+        self.stdout.write(self.style.SUCCESS(f'Re-seeded trending scores for {count} posts'))
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from posts.counters import post_counters, reconcile, user_counters
+from posts.models import Post, Like, Comment
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in denormalized like/comment/follower counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='report drift without fixing it')
+
+    def handle(self, *args, **options):
+        targets = [
+            (Post, post_counters(Post, Like, Comment)),
+            (User, user_counters(User)),
+        ]
+        for model, counters in targets:
+            for field, actual in counters.items():
+                drifted = reconcile(model.objects.all(), field, actual, dry_run=options['dry_run'])
+                self.stdout.write(f'{model.__name__}.{field}: {drifted} rows drifted')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Counters reconciled'))
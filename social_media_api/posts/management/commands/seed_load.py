@@ -0,0 +1,93 @@
+import bisect
+import itertools
+import json
+import random
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from accounts.follows import Follow
+from posts.models import Post, Like, Comment
+
+User = get_user_model()
+BATCH_SIZE = 2000
+
+
+class Zipf:
+    """Draws ranks 0..n-1 with P(rank) ~ 1 / (rank + 1) ** exponent: a few users get most of the attention."""
+
+    def __init__(self, n, exponent, rng):
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+    def draw(self):
+        return bisect.bisect(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+
+def _bulk_create(model, rows, **kwargs):
+    created = []
+    for i in range(0, len(rows), BATCH_SIZE):
+        created += model.objects.bulk_create(rows[i:i + BATCH_SIZE], **kwargs)
+    return created
+
+
+class Command(BaseCommand):
+    help = 'Seed users, a power-law follow graph, posts, likes and comments for the load_test command'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--likes', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--max-following', type=int, default=100, help='most accounts one user follows')
+        parser.add_argument('--exponent', type=float, default=1.1, help='Zipf exponent of popularity')
+        parser.add_argument('--prefix', default='load', help='username prefix; must not be in use yet')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='load_seed.json', help='user ids, tokens and post ids for load_test')
+
+    def handle(self, *args, **options):
+        prefix, rng = options['prefix'], random.Random(options['seed'])
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'users named {prefix}-* already exist; pick another --prefix')
+
+        users = _bulk_create(User, [User(username=f'{prefix}-{i}', password='!') for i in range(options['users'])])
+        tokens = _bulk_create(Token, [Token(user=user, key=Token.generate_key()) for user in users])
+        popularity = Zipf(len(users), options['exponent'], rng)  # users[0] is the most followed
+
+        follows = set()
+        for follower in range(len(users)):
+            # out-degree is heavy-tailed too: most users follow a few accounts, some follow many
+            for _ in range(min(options['max_following'], int(rng.paretovariate(1.2)) * 3)):
+                target = popularity.draw()
+                if target != follower:
+                    follows.add((follower, target))
+        _bulk_create(Follow, [
+            Follow(from_customuser_id=users[target].id, to_customuser_id=users[follower].id)
+            for follower, target in follows
+        ], ignore_conflicts=True)
+        self.stdout.write(f'{len(users)} users, {len(follows)} follows')
+
+        posts = _bulk_create(Post, [
+            Post(author=users[popularity.draw()], title=f'load post {i}', content=f'seeded post number {i} ' * 5)
+            for i in range(options['posts'])
+        ])
+        post_rank = Zipf(len(posts), options['exponent'], rng)  # a few posts go viral
+        likes = {(rng.randrange(len(users)), post_rank.draw()) for _ in range(options['likes'])}
+        _bulk_create(Like, [Like(user=users[u], post=posts[p]) for u, p in likes], ignore_conflicts=True)
+        _bulk_create(Comment, [
+            Comment(post=posts[post_rank.draw()], author=users[rng.randrange(len(users))], content=f'comment {i}')
+            for i in range(options['comments'])
+        ])
+        self.stdout.write(f'{len(posts)} posts, {len(likes)} likes, {options["comments"]} comments')
+
+        # bulk_create skips the counters, timelines and trending scores the views maintain
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_trending', stdout=self.stdout)
+        call_command('backfill_timelines', user_ids=[user.id for user in users], stdout=self.stdout)
+
+        with open(options['output'], 'w') as f:
+            json.dump({
+                'tokens': {str(token.user_id): token.key for token in tokens},
+                'post_ids': [post.id for post in posts],
+            }, f)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-17 07:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk):
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    return Coalesce(Subquery(rows.annotate(n=Count('*')).values('n')), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    # self-contained on purpose: migrations must not change when app code does
+    apps.get_model('posts', 'Post').objects.update(
+        like_count=_count(apps.get_model('posts', 'Like'), 'post'),
+        comment_count=_count(apps.get_model('posts', 'Comment'), 'post'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_keyset_indexes'),
+        ('accounts', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
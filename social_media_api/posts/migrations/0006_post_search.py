@@ -0,0 +1,76 @@
+# Generated by Django 6.0 on 2026-10-17 08:05
+
+import django.db.models.deletion
+import posts.models
+from django.db import migrations, models
+
+# SQLite: an FTS5 external-content table; triggers keep it in step with posts_post.
+# A later migration that rebuilds posts_post on SQLite (e.g. AlterField) drops the triggers.
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5(
+        title, content, content='posts_post', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_update AFTER UPDATE OF title, content ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+]
+
+
+def _pg_index():
+    # built from the same SearchVector posts.search queries with, so the expressions match
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    return GinIndex(SearchVector('title', 'content', config='english'), name='post_search_idx')
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('posts', 'Post'), _pg_index())
+    elif vendor == 'sqlite':
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+    # other databases fall back to posts.search.ContainsSearch
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('posts', 'Post'), _pg_index())
+    elif vendor == 'sqlite':
+        for name in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS posts_post_fts_{name}')
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.CreateModel(
+            name='PostSearchDocument',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='posts.post')),
+                ('document', posts.models.SearchDocumentField(db_column='posts_post_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-17 08:20
+
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# the triggers from 0006_post_search, as they were created there
+SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_update AFTER UPDATE OF title, content ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    # adding the columns rebuilds posts_post on SQLite, which drops the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+def seed_scores(apps, schema_editor):
+    # posts from the last two eras: weight 3 per post, 1 per like, 2 per comment, as if all made
+    # at the post's creation, doubling every half-life from the start of the post's era
+    Post = apps.get_model('posts', 'Post')
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE', 6 * 3600)
+    weights = {'post': 3, 'like': 1, 'comment': 2, **getattr(settings, 'TRENDING_WEIGHTS', {})}
+    era_seconds = half_life * 8
+    era = int(timezone.now().timestamp() // era_seconds)
+    since = datetime.fromtimestamp((era - 1) * era_seconds, tz=dt_timezone.utc)
+    batch = []
+    for post in Post.objects.filter(created_at__gte=since).only('id', 'created_at', 'like_count', 'comment_count'):
+        ts = post.created_at.timestamp()
+        post.trending_era = int(ts // era_seconds)
+        score = weights['post'] + weights['like'] * post.like_count + weights['comment'] * post.comment_count
+        post.trending_score = score * 2 ** ((ts - post.trending_era * era_seconds) / half_life)
+        batch.append(post)
+    Post.objects.bulk_update(batch, ['trending_era', 'trending_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_era',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['trending_era', '-trending_score'], name='post_trending_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(seed_scores, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,76 @@
 from django.db import models
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+class PostQuerySet(models.QuerySet):
+    def with_comments(self, limit=None):
+        """Load authors and comments up front so PostSerializer doesn't query per row.
+
+        With `limit`, only the latest `limit` comments of each post are fetched,
+        picked with a ROW_NUMBER() window over the post's comments.
+        """
+        comments = Comment.objects.select_related('author')
+        if limit is not None:
+            comments = comments.annotate(
+                row=Window(
+                    RowNumber(),
+                    partition_by=F('post_id'),
+                    order_by=[F('created_at').desc(), F('id').desc()],
+                )
+            ).filter(row__lte=limit)
+        return self.select_related('author').prefetch_related(
+            Prefetch('comments', queryset=comments.order_by('created_at', 'id'))
+        )
+
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=255)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)  # set once on creation
     updated_at = models.DateTimeField(auto_now=True)       # updates every save
+    like_count = models.PositiveIntegerField(default=0)     # denormalized, see like_post/unlike_post
+    comment_count = models.PositiveIntegerField(default=0)
+    trending_era = models.PositiveIntegerField(default=0)  # forward-decayed engagement, see posts.trending
+    trending_score = models.FloatField(default=0)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),  # keyset pagination
+            models.Index(fields=['trending_era', '-trending_score'], name='post_trending_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+class SearchDocumentField(models.TextField):
+    """The FTS5 table's hidden column of the same name, which MATCH is run against."""
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+class PostSearchDocument(models.Model):
+    # read-only view of the SQLite FTS5 index created in migration 0006; see posts.search
+    post = models.OneToOneField(Post, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+                                db_constraint=False, related_name='search_document')
+    document = SearchDocumentField(db_column='posts_post_fts')
+    rank = models.FloatField()  # bm25, lower is better
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -20,6 +78,12 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='comment_created_idx'),
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),  # a post's thread
+        ]
+
     def __str__(self):
         return f'Comment by {self.author} on {self.post}'
 
@@ -29,4 +93,19 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'post')  # prevents liking the same post twice
\ No newline at end of file
+        unique_together = ('user', 'post')  # prevents liking the same post twice
+        indexes = [
+            models.Index(fields=['post', 'user'], name='like_post_user_idx'),  # a post's likers
+        ]
+
+class TimelineEntry(models.Model):
+    # materialized home timeline row: "post shows up in user's feed"
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()  # copied from the post so the feed is one range scan
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_idx'),
+        ]
@@ -0,0 +1,89 @@
+"""Full-text search over Post.title/content.
+
+Each backend turns a query string into a Post queryset annotated with a
+float `rank` (higher is better), so results can be keyset-paginated on
+('-rank', '-id'). The index behind each engine is created by migration
+0006_post_search and kept in sync by the database itself (an expression
+index on PostgreSQL, triggers on SQLite), so saves need no extra code.
+"""
+import re
+import threading
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.utils.module_loading import import_string
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_CONFIG = 'english'
+
+def _terms(query):
+    return re.findall(r'\w+', query)
+
+
+class PostgresSearch:
+    """to_tsvector(title || content) backed by the post_search_idx GIN expression index."""
+
+    def search(self, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+        # must match the indexed expression exactly for the planner to use post_search_idx
+        vector = SearchVector('title', 'content', config=SEARCH_CONFIG)
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            Post.objects.annotate(document=vector)
+            .filter(document=search_query)
+            .annotate(rank=SearchRank(vector, search_query))
+        )
+
+
+class SqliteSearch:
+    """FTS5 external-content table over posts_post, ranked by bm25."""
+
+    def search(self, query):
+        terms = _terms(query)
+        if not terms:
+            return Post.objects.none()
+        match = ' '.join(f'"{term}"' for term in terms)  # quoted, so user input can't use FTS syntax
+        # one join against the index; bm25 is lower-is-better, so negate it to rank descending
+        return Post.objects.filter(search_document__document__match=match).annotate(
+            rank=-F('search_document__rank'),
+        )
+
+
+class ContainsSearch:
+    """Unindexed fallback: every term must appear in the title or content; newest first."""
+
+    def search(self, query):
+        terms = _terms(query)
+        if not terms:
+            return Post.objects.none()
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(content__icontains=term)
+        return Post.objects.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _default_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearch()
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        return SqliteSearch()
+    return ContainsSearch()
+
+
+def get_backend():
+    """POST_SEARCH_BACKEND (an import path) if set, otherwise the best engine the database has."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(settings, 'POST_SEARCH_BACKEND', None)
+            _backend = import_string(path)() if path else _default_backend()
+        return _backend
+
+
+def search_posts(query):
+    return get_backend().search(query)
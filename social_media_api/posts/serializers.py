@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .like_buffer import get_buffer
 from .models import Post, Comment
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -14,4 +15,12 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at', 'comments']
\ No newline at end of file
+        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at',
+                  'like_count', 'comment_count', 'comments']
+        read_only_fields = ['like_count', 'comment_count']
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        buffer = get_buffer()
+        if buffer is not None:
+            data['like_count'] += buffer.delta(instance.id)  # likes still waiting in this process's buffer
+        return data
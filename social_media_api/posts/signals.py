@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Post, Comment, Like
+from . import cache, timeline, trending
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: timeline.fan_out_post(instance))
+
+
+@receiver(pre_save, sender=Post)
+def seed_trending_score(sender, instance, **kwargs):
+    if instance._state.adding and not instance.trending_era:
+        for field, value in trending.initial().items():
+            setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    cache.post_saved(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    cache.comment_changed(instance.pk, instance.post_id)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_liked_post(sender, instance, **kwargs):
+    # the API's like path writes with raw SQL and calls cache.post_changed itself
+    cache.post_changed(instance.post_id)
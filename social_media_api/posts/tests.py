@@ -1,3 +1,671 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from accounts import follows
+from request_budget.testing import QueryBudgetAssertions
+from social_media_api import db_router
+from social_media_api.query_plans import QueryPlanAssertions, plan_problems
+from social_media_api.renderers import ORJSONRenderer
+from .models import Post, Comment, Like, TimelineEntry
+from . import cache as post_cache, like_buffer, search, timeline, trending
 
-# Create your tests here.
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TimelineTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        follows.follow(self.alice, self.bob)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.alice).key)
+
+    def create_post(self, author, title='hello'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, title=title, content='...')
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        post = self.create_post(self.bob)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.alice, post=post).exists())
+
+        response = self.client.get('/api/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.data['results']], [post.id])
+
+    def test_feed_pages_walk_every_entry(self):
+        posts = [self.create_post(self.bob, f'post {i}') for i in range(3)]
+        response = self.client.get('/api/feed/', {'page_size': 2})
+        seen = [p['id'] for p in response.data['results']]
+        seen += [p['id'] for p in self.client.get(response.data['next']).data['results']]
+        self.assertEqual(seen, [p.id for p in reversed(posts)])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=1)
+    def test_high_fanout_author_is_merged_at_read_time(self):
+        post = self.create_post(self.bob)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+        response = self.client.get('/api/feed/')
+        self.assertEqual([p['id'] for p in response.data['results']], [post.id])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        carol = User.objects.create_user(username='carol', password='pass12345')
+        post = self.create_post(carol)
+
+        self.client.post(f'/api/accounts/follow/{carol.id}/')
+        self.assertTrue(TimelineEntry.objects.filter(user=self.alice, post=post).exists())
+
+        self.client.post(f'/api/accounts/unfollow/{carol.id}/')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.alice, post=post).exists())
+
+    def test_writes_read_follows_from_the_database(self):
+        carol = User.objects.create_user(username='carol', password='pass12345')
+        follows.follow(self.alice, carol)
+        follows.Follow.objects.filter(from_customuser=carol).delete()  # unfollowed by another worker
+
+        response = self.client.post(f'/api/accounts/follow/{carol.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.alice.following.filter(pk=carol.pk).exists())
+
+        follows.Follow.objects.filter(from_customuser=carol).delete()
+        dave = User.objects.create_user(username='dave', password='pass12345')
+        follows.Follow.objects.create(from_customuser=carol, to_customuser=dave)  # followed elsewhere
+        post = self.create_post(carol)
+        self.assertEqual(list(TimelineEntry.objects.filter(post=post).values_list('user_id', flat=True)), [dave.id])
+
+    @override_settings(FEED_TIMELINE_LIMIT=3)
+    def test_trim_keeps_newest_entries(self):
+        posts = [self.create_post(self.bob, f'post {i}') for i in range(5)]
+        call_command('backfill_timelines', trim=True, stdout=StringIO())
+        kept = TimelineEntry.objects.filter(user=self.alice).order_by('-created_at', '-post')
+        self.assertEqual([e.post_id for e in kept], [p.id for p in posts[:1:-1]])
+
+    def test_rebuild_timeline(self):
+        post = self.create_post(self.bob)
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild_timeline(self.alice)
+        self.assertEqual(list(TimelineEntry.objects.values_list('post_id', flat=True)), [post.id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author', password='pass12345')
+        Post.objects.bulk_create([Post(author=author, title=f'post {i}', content='...') for i in range(25)])
+
+    def test_cursor_walks_every_post_once_without_count(self):
+        seen, url = [], '/api/posts/'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in q['sql'] for q in queries.captured_queries))
+            seen += [p['id'] for p in response.data['results']]
+            url = response.data['next']
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/posts/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_values_are_404(self):
+        from social_media_api.pagination import KeysetPagination
+        cursors = [['garbage', 1], ['2026-01-01T00:00:00', 'abc'], [None, None], [[1], {}]]
+        for values in cursors:
+            with self.subTest(values=values):
+                cursor = KeysetPagination().encode_cursor(values)
+                self.assertEqual(self.client.get('/api/posts/', {'cursor': cursor}).status_code, 404)
+                self.assertEqual(self.client.get('/api/posts/search/', {'q': 'post', 'cursor': cursor}).status_code, 404)
+        naive = KeysetPagination().encode_cursor(['2999-01-01T00:00:00', 1])
+        self.assertEqual(len(self.client.get('/api/posts/', {'cursor': naive}).data['results']), 10)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostQueryPlanTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'user{i}', password='pass12345') for i in range(3)]
+        for i in range(10):
+            post = Post.objects.create(author=self.users[i % 3], title=f'post {i}', content='...')
+            for j in range(5):
+                Comment.objects.create(post=post, author=self.users[j % 3], content=f'comment {j}')
+
+    def test_list_query_count_is_constant(self):
+        with self.assertNumQueries(3):  # validators, posts + authors, then comments + authors
+            response = self.client.get('/api/posts/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(response.data['results'][0]['comments']), 5)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_conditional_get(self):
+        response = self.client.get('/api/posts/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)  # counters and deletions don't move any timestamp
+        with self.assertNumQueries(1):  # the validator query only; nothing is serialized
+            self.assertEqual(self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/posts/', {'comments': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        post = Post.objects.order_by('-id').first()
+        Post.objects.filter(pk=post.pk).update(like_count=1)  # counters don't touch updated_at
+        self.assertEqual(self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        detail = self.client.get(f'/api/posts/{post.id}/')
+        self.assertEqual(self.client.get(f'/api/posts/{post.id}/', HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 304)
+        comment = post.comments.first()
+        comment.content = 'edited'
+        comment.save()
+        self.assertEqual(self.client.get(f'/api/posts/{post.id}/', HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 200)
+        comment_etag = self.client.get(f'/api/comments/{comment.id}/')['ETag']
+        self.assertEqual(self.client.get(f'/api/comments/{comment.id}/', HTTP_IF_NONE_MATCH=comment_etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/posts/999999/').status_code, 404)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache_hits_and_invalidation(self):
+        self.client.get('/api/posts/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/posts/')
+            self.assertEqual(response['X-Cache'], 'HIT')
+            self.assertEqual(self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        post = Post.objects.order_by('-id').first()
+        alice = self.users[0]
+        self.client.force_authenticate(alice)
+        self.client.post(f'/api/{post.id}/like/')
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['like_count'], 1)
+
+        detail = self.client.get(f'/api/posts/{post.id}/')
+        other = Post.objects.order_by('id').first()
+        other.title = 'edited'
+        other.save()  # a different post leaves this detail cached
+        self.assertEqual(self.client.get(f'/api/posts/{post.id}/')['X-Cache'], 'HIT')
+        comment = post.comments.first()
+        comment.delete()
+        detail = self.client.get(f'/api/posts/{post.id}/')
+        self.assertEqual((detail['X-Cache'], len(detail.data['comments'])), ('MISS', 4))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_list_pages_are_retired_only_by_their_own_posts(self):
+        page = {'page_size': 3}
+        self.client.get('/api/posts/', page)
+        oldest = Post.objects.order_by('id').first()
+        self.client.force_authenticate(self.users[0])
+        self.client.post(f'/api/{oldest.id}/like/')
+        Comment.objects.create(post=oldest, author=self.users[1], content='off page')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/posts/', page)['X-Cache'], 'HIT')
+
+        newest = Post.objects.order_by('-id').first()
+        Comment.objects.create(post=newest, author=self.users[1], content='on page')
+        response = self.client.get('/api/posts/', page)
+        self.assertEqual((response['X-Cache'], len(response.data['results'][0]['comments'])), ('MISS', 6))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_page_built_while_one_of_its_posts_changed_is_not_stored(self):
+        newest = Post.objects.order_by('-id').first()
+        page_generations = post_cache.page_generations
+
+        def like_lands_after_the_page_was_read(data):
+            post_cache.post_changed(newest.id)
+            return page_generations(data)
+
+        with mock.patch.object(post_cache, 'page_generations', like_lands_after_the_page_was_read):
+            self.assertEqual(self.client.get('/api/posts/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/posts/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/posts/')['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True, ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_cached_next_link_uses_each_requests_host(self):
+        first = self.client.get('/api/posts/', {'page_size': 3}, HTTP_HOST='a.example')
+        second = self.client.get('/api/posts/', {'page_size': 3}, HTTP_HOST='b.example')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertTrue(first.data['next'].startswith('http://a.example/api/posts/?'))
+        self.assertEqual(second.data['next'], first.data['next'].replace('a.example', 'b.example'))
+
+    def test_single_flight(self):
+        from social_media_api.response_cache import single_flight
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'data': 1}, True
+
+        cache.add('k:lock', 1, 5)  # another request is already recomputing...
+        threading.Timer(0.05, cache.set, ('k', {'data': 'theirs'})).start()  # ...and finishes shortly
+        self.assertEqual(single_flight('k', compute, 60), {'data': 'theirs'})
+        self.assertEqual(calls, [])
+
+        cache.clear()
+        self.assertEqual(single_flight('k', compute, 60), {'data': 1})
+        self.assertEqual(single_flight('k', compute, 60), {'data': 1})
+        self.assertEqual(len(calls), 1)
+
+    def test_latest_comments_cap(self):
+        response = self.client.get('/api/posts/', {'comments': 2})
+        post = Post.objects.get(id=response.data['results'][0]['id'])
+        latest = list(post.comments.order_by('-created_at', '-id').values_list('id', flat=True)[:2])
+        self.assertEqual([c['id'] for c in response.data['results'][0]['comments']], latest[::-1])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        self.post = Post.objects.create(author=self.bob, title='hello', content='...')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.alice).key)
+
+    def test_like_and_comment_counters(self):
+        self.client.post(f'/api/{self.post.id}/like/')
+        self.client.post(f'/api/{self.post.id}/like/')  # second like is rejected, not counted
+        response = self.client.post('/api/comments/', {'post': self.post.id, 'content': 'nice'})
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+
+        self.client.post(f'/api/{self.post.id}/unlike/')
+        self.client.delete(f"/api/comments/{response.data['id']}/")
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (0, 0))
+
+    def test_like_toggle_returns_count(self):
+        self.assertEqual(self.client.post(f'/api/{self.post.id}/like/').data['like_count'], 1)
+        response = self.client.post(f'/api/{self.post.id}/like/')
+        self.assertEqual((response.status_code, response.data['like_count']), (400, 1))
+        self.assertEqual(self.client.post(f'/api/{self.post.id}/unlike/').data['like_count'], 0)
+        self.assertEqual(self.client.post(f'/api/{self.post.id}/unlike/').status_code, 400)
+        self.assertEqual(self.client.post('/api/999999/like/').status_code, 404)
+        self.assertEqual(self.client.post('/api/999999/unlike/').status_code, 404)
+
+    def test_repeat_like_is_one_write_round_trip(self):
+        self.client.post(f'/api/{self.post.id}/like/')
+        with self.assertNumQueries(4):  # savepoint, insert (no-op), counter update/returning, release
+            self.client.post(f'/api/{self.post.id}/like/')
+
+    def test_follow_counters(self):
+        self.client.post(f'/api/accounts/follow/{self.bob.id}/')
+        self.client.post(f'/api/accounts/follow/{self.bob.id}/')
+        self.bob.refresh_from_db()
+        self.alice.refresh_from_db()
+        self.assertEqual((self.bob.follower_count, self.alice.following_count), (1, 1))
+
+        self.client.post(f'/api/accounts/unfollow/{self.bob.id}/')
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.follower_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        Like.objects.create(user=self.alice, post=self.post)
+        User.objects.filter(id=self.bob.id).update(follower_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.bob.follower_count), (1, 0))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, LIKE_BUFFER_ENABLED=True, LIKE_BUFFER_HOT_RATE=1, LIKE_BUFFER_FLUSH_MS=0)
+class LikeBufferTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        self.journal_dir = journal_dir.name
+        like_buffer._buffer = None
+        self.addCleanup(setattr, like_buffer, '_buffer', None)
+        self.addCleanup(setattr, like_buffer, '_unsupported_logged', False)
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        self.post = Post.objects.create(author=self.bob, title='hello', content='...')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.alice).key)
+
+    def test_disabled_without_fcntl(self):
+        with mock.patch.object(like_buffer, 'fcntl', None), self.assertLogs('posts.like_buffer', 'WARNING'):
+            self.assertIsNone(like_buffer.get_buffer())
+            self.assertEqual(self.client.post(f'/api/{self.post.id}/like/').status_code, 200)
+        self.assertTrue(Like.objects.exists())
+
+    def test_buffered_like_reads_own_write_then_flushes(self):
+        with self.settings(LIKE_BUFFER_JOURNAL_DIR=self.journal_dir):
+            self.assertEqual(self.client.post(f'/api/{self.post.id}/like/').data['like_count'], 1)
+            self.assertEqual(self.client.post(f'/api/{self.post.id}/like/').status_code, 400)
+            self.assertFalse(Like.objects.exists())
+            self.assertEqual(self.client.get(f'/api/posts/{self.post.id}/').data['like_count'], 1)
+
+            self.assertEqual(like_buffer.get_buffer().flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(Like.objects.filter(user=self.alice, post=self.post).exists())
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.id}/').data['like_count'], 1)
+        self.assertEqual(len(os.listdir(self.journal_dir)), 1)  # only the live, empty journal
+
+    def test_like_then_unlike_in_one_batch(self):
+        with self.settings(LIKE_BUFFER_JOURNAL_DIR=self.journal_dir):
+            self.client.post(f'/api/{self.post.id}/like/')
+            self.assertEqual(self.client.post(f'/api/{self.post.id}/unlike/').data['like_count'], 0)
+            like_buffer.get_buffer().flush()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, Like.objects.count()), (0, 0))
+
+    def test_flush_cannot_land_between_the_reads_and_the_buffer_check(self):
+        filter_likes = Like.objects.filter
+        raced = []
+
+        def filter_racing_a_flush(**kwargs):
+            # the like is still pending when toggle reads the table; a flush that can
+            # get in before toggle looks at the buffer commits it and clears the intent
+            queryset = filter_likes(**kwargs)
+            buffer = like_buffer.get_buffer()
+            if not raced and buffer._flush_lock.acquire(blocking=False):
+                buffer._flush_lock.release()
+                raced.append(True)
+                stale = queryset.exists()
+                buffer.flush()
+                return mock.Mock(exists=lambda: stale)
+            return queryset
+
+        with self.settings(LIKE_BUFFER_JOURNAL_DIR=self.journal_dir):
+            self.client.post(f'/api/{self.post.id}/like/')
+            with mock.patch.object(Like.objects, 'filter', side_effect=filter_racing_a_flush):
+                response = self.client.post(f'/api/{self.post.id}/like/')
+            like_buffer.get_buffer().flush()
+        self.assertEqual((response.status_code, response.data['like_count']), (400, 1))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, Like.objects.count()), (1, 1))
+
+    def test_orphaned_journal_is_replayed(self):
+        orphan = os.path.join(self.journal_dir, 'likes-1-dead.jsonl')
+        with open(orphan, 'w') as f:
+            f.write(f'[{self.alice.id}, {self.post.id}, 1]\n[{self.bob.id}, {self.post.id}, 1]\n[{self.bob.id}, ')
+        with self.settings(LIKE_BUFFER_JOURNAL_DIR=self.journal_dir):
+            self.assertEqual(like_buffer.get_buffer().recover(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 2)
+        self.assertFalse(os.path.exists(orphan))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        Post.objects.create(author=self.alice, title='Django tips', content='keyset pagination beats offsets')
+        Post.objects.create(author=self.alice, title='Cooking', content='django the cat watched me cook')
+        self.other = Post.objects.create(author=self.alice, title='Gardening', content='tomatoes')
+        for i in range(3):
+            Post.objects.create(author=self.alice, title=f'Django django {i}', content='django everywhere')
+
+    def test_ranked_and_paginated(self):
+        self.assertIsInstance(search.get_backend(), search.SqliteSearch)
+        response = self.client.get('/api/posts/search/', {'q': 'django', 'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        first = response.data['results']
+        self.assertTrue(all(p['title'].startswith('Django django') for p in first))
+        rest = self.client.get(response.data['next']).data['results']
+        self.assertEqual({p['title'] for p in rest}, {'Django tips', 'Cooking'})
+
+    def test_index_follows_edits_and_quotes_input(self):
+        self.other.content = 'django in the greenhouse'
+        self.other.save()
+        titles = [p['title'] for p in self.client.get('/api/posts/search/', {'q': 'greenhouse'}).data['results']]
+        self.assertEqual(titles, ['Gardening'])
+        self.other.delete()
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'greenhouse'}).data['results'], [])
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': 'AND OR "*'}).data['results'], [])
+        self.assertEqual(self.client.get('/api/posts/search/').status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, TRENDING_CACHE_SECONDS=0)
+class TrendingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        self.quiet = Post.objects.create(author=self.bob, title='quiet', content='...')
+        self.busy = Post.objects.create(author=self.bob, title='busy', content='...')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.alice).key)
+
+    def test_engagement_ranks_posts_without_reading_likes(self):
+        self.client.post(f'/api/{self.busy.id}/like/')
+        self.client.post('/api/comments/', {'post': self.busy.id, 'content': 'nice'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/trending/')
+        self.assertEqual([p['title'] for p in response.data['results']], ['busy', 'quiet'])
+        self.assertFalse(any('posts_like' in q['sql'] for q in ctx.captured_queries))
+
+        self.client.post(f'/api/{self.busy.id}/unlike/')
+        self.busy.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertAlmostEqual(self.busy.trending_score - self.quiet.trending_score,
+                               trending.increment(trending.weights()['comment'])[1], delta=0.01)
+
+    def test_unlike_and_comment_delete_take_back_their_contribution(self):
+        baseline = Post.objects.get(pk=self.busy.pk).trending_score
+        for _ in range(3):
+            self.client.post(f'/api/{self.busy.id}/like/')
+            self.client.post(f'/api/{self.busy.id}/unlike/')
+        comment = self.client.post('/api/comments/', {'post': self.busy.id, 'content': 'nice'}).data
+        self.client.delete(f"/api/comments/{comment['id']}/")
+        self.assertAlmostEqual(Post.objects.get(pk=self.busy.pk).trending_score, baseline)
+
+        # a like from a half-life ago added half as much, and its unlike takes back only that
+        liked_at = timezone.now() - timedelta(seconds=trending.half_life())
+        Like.objects.create(user=self.alice, post=self.busy)
+        Like.objects.filter(post=self.busy).update(created_at=liked_at)
+        Post.objects.filter(pk=self.busy.pk).update(like_count=1, **trending.update_expressions([(1, liked_at)]))
+        self.client.post(f'/api/{self.busy.id}/unlike/')
+        self.assertAlmostEqual(Post.objects.get(pk=self.busy.pk).trending_score, baseline)
+
+    def test_older_engagement_decays(self):
+        now = timezone.now()
+        half_life = timedelta(seconds=trending.half_life())
+        era, fresh = trending.increment(1, now)
+        older_era, older = trending.increment(1, now - half_life)
+        if older_era == era:
+            self.assertAlmostEqual(fresh / older, 2)
+        else:  # crossed an era boundary: compare in current-era units
+            self.assertAlmostEqual(fresh / (older * trending.carry()), 2)
+
+        Post.objects.filter(pk=self.quiet.pk).update(trending_era=era - 1, trending_score=fresh / trending.carry())
+        Post.objects.filter(pk=self.busy.pk).update(trending_era=era, trending_score=fresh * 0.99)
+        self.assertEqual(trending.top_post_ids(2), [self.quiet.id, self.busy.id])
+        self.assertEqual(trending.top_post_ids(1), [self.quiet.id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RendererTests(APITestCase):
+    def test_orjson_output_matches_stdlib(self):
+        data = {
+            'when': timezone.now(),
+            'price': Decimal('1.50'),
+            'text': 'café  ',
+            1: [None, True],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_api_round_trip(self):
+        user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        response = self.client.post('/api/posts/', '{"title": "té", "content": "c"}',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['title'], 'té')
+
+        response = self.client.post('/api/posts/', '{"title": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        db_router.lag_monitor.reset()
+        self.factory = RequestFactory()
+        patcher = mock.patch.object(db_router, 'replica_aliases', return_value=['replica_0'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(db_router, '_PER_PROCESS_CACHES', ())  # the tests' locmem stands in for Redis
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, method, token='a', model=Post, writes=False):
+        """The database a read of `model` goes to during a request from `token`'s client."""
+        seen = []
+
+        def view(request):
+            if writes:
+                router.db_for_write(model)
+            seen.append(router.db_for_read(model))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/api/posts/', HTTP_AUTHORIZATION=f'Token {token}')
+        db_router.ReplicaMiddleware(view)(request)
+        return seen[0]
+
+    def test_safe_reads_go_to_replica_and_writes_stick_to_primary(self):
+        with mock.patch.object(db_router.lag_monitor, 'measure', return_value=0.0):
+            self.assertEqual(self.route('get'), 'replica_0')
+            self.assertEqual(self.route('get', model=Token), 'default')
+            self.assertEqual(self.route('post'), 'default')
+            self.assertEqual(self.route('get'), 'replica_0')  # that POST wrote nothing
+            self.assertEqual(self.route('post', writes=True), 'default')
+            self.assertEqual(self.route('get'), 'default')  # read-your-writes
+            self.assertEqual(self.route('get', token='b'), 'replica_0')
+        self.assertEqual(router.db_for_read(Post), 'default')  # outside a request
+
+    def test_a_get_that_writes_reads_the_primary_and_pins(self):
+        with mock.patch.object(db_router.lag_monitor, 'measure', return_value=0.0):
+            self.assertEqual(self.route('get', writes=True), 'default')
+            self.assertEqual(self.route('get'), 'default')
+
+    def test_raw_sql_likes_pin_the_client(self):
+        alice = User.objects.create_user(username='alice', password='pass12345')
+        post = Post.objects.create(author=alice, title='hello', content='...')
+        token = Token.objects.create(user=alice).key
+        with mock.patch.object(db_router.lag_monitor, 'measure', return_value=0.0):
+            self.client.post(f'/api/{post.id}/like/', HTTP_AUTHORIZATION=f'Token {token}', secure=True)
+            self.assertEqual(self.route('get', token=token), 'default')
+
+    def test_replicas_need_a_shared_cache(self):
+        with mock.patch.object(db_router, '_PER_PROCESS_CACHES', (settings.CACHES['default']['BACKEND'],)):
+            with self.assertRaises(ImproperlyConfigured):
+                db_router.ReplicaMiddleware(HttpResponse)
+
+    def test_lagging_or_unreachable_replica_is_skipped(self):
+        with mock.patch.object(db_router.lag_monitor, 'measure', return_value=60.0):
+            self.assertEqual(self.route('get'), 'default')
+        db_router.lag_monitor.reset()
+        with mock.patch.object(db_router.lag_monitor, 'measure', return_value=None):
+            self.assertEqual(self.route('get'), 'default')
+
+
+class IndexPlanTests(QueryPlanAssertions, APITestCase):
+    """EXPLAIN the hot read queries; a table scan or sort means an index went missing."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.post = Post.objects.create(author=self.alice, title='t', content='c')
+
+    def test_post_lists(self):
+        self.assertIndexed(Post.objects.order_by('-created_at', '-id')[:11], 'post_created_idx')
+        self.assertIndexed(
+            Post.objects.filter(author=self.alice).order_by('-created_at', '-id')[:11], 'post_author_created_idx'
+        )
+        self.assertIndexed(
+            TimelineEntry.objects.filter(user=self.alice).order_by('-created_at', '-post')[:11],
+            'timeline_user_created_idx',
+        )
+
+    def test_feed_queries(self):
+        self.assertIndexed(timeline.feed_queryset(self.alice)[:11], 'timeline_user_created_idx')
+        self.assertIndexed(timeline.recent_posts([self.alice.id]), 'post_author_created_idx')
+        # several authors: each is an index probe, but merging them by created_at needs a sort
+        bob = User.objects.create_user(username='bob', password='pass12345')
+        problems = plan_problems(timeline.recent_posts([self.alice.id, bob.id]), 'post_author_created_idx')
+        self.assertEqual({problem for problem, _ in problems} - {'sort'}, set())
+
+    def test_comments_by_post(self):
+        self.assertIndexed(Comment.objects.filter(post=self.post).order_by('created_at', 'id'), 'comment_post_created_idx')
+
+    def test_likes_by_post(self):
+        self.assertIndexed(Like.objects.filter(post=self.post).values('user_id'), 'like_post_user_idx')
+        self.assertIndexed(Like.objects.filter(post=self.post, user_id__in=[self.alice.id]))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, RESPONSE_CACHE_ENABLED=False)
+class RequestBudgetTests(QueryBudgetAssertions, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        follows.follow(self.alice, self.bob)
+        for i in range(10):
+            post = Post.objects.create(author=self.bob, title=f'post {i}', content='...')
+            for j in range(3):
+                Comment.objects.create(post=post, author=self.alice, content=f'comment {j}')
+        self.post = post
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.alice).key)
+
+    def test_endpoints_within_budget(self):
+        for path in ('/api/posts/', f'/api/posts/{self.post.id}/', '/api/comments/', '/api/feed/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertQueryBudget(response)
+        self.assertQueryBudget(self.client.post('/api/comments/', {'post': self.post.id, 'content': 'hi'}))
+
+    @override_settings(REQUEST_BUDGET_SERVER_TIMING=True, REQUEST_BUDGETS={'post-list': {'queries': 1}})
+    def test_server_timing_and_violation_log(self):
+        with self.assertLogs('request_budget', 'WARNING') as logs:
+            response = self.client.get('/api/posts/')
+        self.assertIn('GET post-list over budget', logs.output[0])
+        stats = response.request_budget
+        self.assertGreater(stats.queries, 1)
+        self.assertGreater(stats.serializer_ms, 0)
+        self.assertIn(f'db;desc="{stats.queries} queries"', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+    def test_serializer_timing_wraps_drf_once_across_reloads(self):
+        from rest_framework.serializers import BaseSerializer
+        from request_budget import middleware
+        original = BaseSerializer.data.fget.request_budget_original
+        importlib.reload(middleware)
+        middleware._instrument_serializers()
+        middleware._instrument_serializers()
+        self.assertIs(BaseSerializer.data.fget.request_budget_original, original)
+        self.assertGreater(self.client.get('/api/posts/').request_budget.serializer_ms, 0)
+
+
+class SeedLoadTests(APITestCase):
+    def test_seed_keeps_counters_and_timelines_consistent(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'seed.json')
+            call_command('seed_load', users=40, posts=60, likes=200, comments=50, output=output, stdout=StringIO())
+            with open(output) as f:
+                seed = json.load(f)
+        self.assertEqual(len(seed['tokens']), 40)
+        self.assertEqual(sorted(seed['post_ids']), list(Post.objects.order_by('id').values_list('id', flat=True)))
+        post = Post.objects.order_by('-like_count').first()
+        self.assertEqual(post.like_count, post.likes.count())
+        most_followed = User.objects.order_by('-follower_count').first()
+        self.assertEqual(most_followed.follower_count, most_followed.followers.count())
+        self.assertTrue(TimelineEntry.objects.exists())
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from accounts.follows import Follow
+from .models import Post, TimelineEntry
+
+BATCH_SIZE = 1000
+# feed_id is the timeline's own post_id column, so a page is one walk of timeline_user_created_idx
+FEED_ORDERING = ('-feed_at', '-feed_id')
+
+
+def fanout_threshold():
+    # authors with at least this many followers are merged into feeds at read time
+    return getattr(settings, 'FEED_FANOUT_THRESHOLD', 1000)
+
+
+def backfill_limit():
+    # how many of an author's recent posts to copy into a timeline on follow/rebuild
+    return getattr(settings, 'FEED_BACKFILL_LIMIT', 200)
+
+
+def timeline_limit():
+    # entries kept per timeline; older ones are trimmed (see trim_timelines)
+    return getattr(settings, 'FEED_TIMELINE_LIMIT', 800)
+
+
+def is_high_fanout(author):
+    # re-read the counter: the instance hanging off a post may be stale
+    count = type(author).objects.values_list('follower_count', flat=True).get(pk=author.pk)
+    return count >= fanout_threshold()
+
+
+def high_fanout_following_ids(user):
+    return list(user.following.filter(follower_count__gte=fanout_threshold()).values_list('id', flat=True))
+
+
+def _follower_ids(author_id):
+    # straight from the database, not accounts.graph: a cached list can be a
+    # worker-local copy that misses a follow made moments ago
+    return Follow.objects.filter(from_customuser_id=author_id).values_list('to_customuser_id', flat=True)
+
+
+def _following_ids(user):
+    return Follow.objects.filter(to_customuser=user).values_list('from_customuser_id', flat=True)
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Push a new post into every follower's timeline (skipped for high-fanout authors)."""
+    if is_high_fanout(post.author):
+        return 0
+    entries = [
+        TimelineEntry(user_id=uid, post_id=post.id, created_at=post.created_at)
+        for uid in _follower_ids(post.author_id)
+    ]
+    _insert(entries)
+    return len(entries)
+
+
+def recent_posts(author_ids):
+    # one author walks post_author_created_idx in order; several are an indexed probe each,
+    # but merging them into one newest-first list needs a sort (no single index has that order)
+    return (
+        Post.objects.filter(author__in=author_ids)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:backfill_limit()]
+    )
+
+
+def _recent_entries(user, author_ids):
+    return [TimelineEntry(user=user, post_id=pid, created_at=created) for pid, created in recent_posts(author_ids)]
+
+
+def trim_timelines(user_ids):
+    """Delete all but the newest timeline_limit() entries of each user; returns the rows deleted."""
+    deleted = 0
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), BATCH_SIZE):
+        ranked = TimelineEntry.objects.filter(user_id__in=user_ids[i:i + BATCH_SIZE]).annotate(
+            row=Window(RowNumber(), partition_by=F('user_id'), order_by=[F('created_at').desc(), F('post_id').desc()])
+        )
+        stale = list(ranked.filter(row__gt=timeline_limit()).values_list('pk', flat=True))
+        for j in range(0, len(stale), BATCH_SIZE):
+            deleted += TimelineEntry.objects.filter(pk__in=stale[j:j + BATCH_SIZE]).delete()[0]
+    return deleted
+
+
+def add_author(user, author):
+    """Called after `user` follows `author`."""
+    if is_high_fanout(author):
+        return
+    _insert(_recent_entries(user, [author.id]))
+
+
+def add_authors(user, authors):
+    """Bulk version of add_author; uses the follower counts already loaded on `authors`."""
+    author_ids = [a.id for a in authors if a.follower_count < fanout_threshold()]
+    if author_ids:
+        _insert(_recent_entries(user, author_ids))
+
+
+def remove_author(user, author):
+    """Called after `user` unfollows `author`."""
+    remove_authors(user, [author.id])
+
+
+def remove_authors(user, author_ids):
+    TimelineEntry.objects.filter(user=user, post__author__in=author_ids).delete()
+
+
+@transaction.atomic
+def rebuild_timeline(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    celebrities = set(high_fanout_following_ids(user))
+    author_ids = [uid for uid in _following_ids(user) if uid not in celebrities]
+    if author_ids:
+        _insert(_recent_entries(user, author_ids))
+
+
+def feed_queryset(user):
+    """Posts for the user's home feed, newest first.
+
+    Normal authors are read from the materialized timeline; high-fanout
+    authors the user follows are merged in at read time.
+    """
+    celebrities = high_fanout_following_ids(user)
+    if not celebrities:
+        return (
+            Post.objects.filter(timeline_entries__user=user)
+            .annotate(feed_at=F('timeline_entries__created_at'), feed_id=F('timeline_entries__post'))
+            .order_by(*FEED_ORDERING)
+        )
+    timeline = TimelineEntry.objects.filter(user=user).values('post_id')
+    return (
+        Post.objects.filter(Q(pk__in=timeline) | Q(author__in=celebrities))
+        .annotate(feed_at=F('created_at'), feed_id=F('id'))
+        .order_by(*FEED_ORDERING)
+    )
@@ -0,0 +1,139 @@
+"""Trending posts from time-decayed engagement scores.
+
+Scores use forward decay. Each event adds weight * 2^(t / half-life),
+measured from the start of the current era, and never touches older
+contributions. An older like therefore counts half as much as one a
+half-life newer, and the order of posts by stored score is the order by
+decayed score. That makes top-K an index scan on
+(trending_era, -trending_score); the Like table is never read.
+
+An era is ERA_HALF_LIVES half-lives long, so stored scores stay small. A
+post's score is carried into the current era (scaled by carry()) the next
+time it changes. Top-K merges the current era with the previous one,
+since anything older has decayed to nothing.
+
+Events update the score in the same UPDATE that maintains like_count and
+comment_count, so trending costs no extra round trip. Unlikes and deleted
+comments subtract the contribution their like or comment was given, so a
+like/unlike cycle leaves the score where it was.
+"""
+import heapq
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+ERA_HALF_LIVES = 8
+MAX_TRENDING = 100
+CACHE_KEY = 'trending:top'
+BATCH_SIZE = 1000
+
+
+def half_life():
+    # seconds for an event's contribution to fall to half
+    return getattr(settings, 'TRENDING_HALF_LIFE', 6 * 3600)
+
+
+def weights():
+    return {'post': 3, 'like': 1, 'comment': 2, **getattr(settings, 'TRENDING_WEIGHTS', {})}
+
+
+def era_seconds():
+    return half_life() * ERA_HALF_LIVES
+
+
+def carry():
+    """Factor that expresses a previous-era score in current-era units."""
+    return 2.0 ** -ERA_HALF_LIVES
+
+
+def increment(weight, when=None):
+    """(era, amount) to add for an event of `weight` happening at `when` (default: now)."""
+    ts = (when or timezone.now()).timestamp()
+    era = int(ts // era_seconds())
+    return era, weight * 2 ** ((ts - era * era_seconds()) / half_life())
+
+
+def change(events, now=None):
+    """(era, amount) to add to a score for `events`, (weight, when) pairs with when=None meaning now.
+
+    The era is the current one and each event is measured from its start, so
+    an event from a past era counts for what it has decayed to. Taking an
+    event back, e.g. an unlike, passes (-weight, <time of the like>) and
+    removes exactly what adding it contributed.
+    """
+    ts = (now or timezone.now()).timestamp()
+    era = int(ts // era_seconds())
+    start = era * era_seconds()
+    amount = sum(
+        weight * 2 ** (((when.timestamp() if when else ts) - start) / half_life())
+        for weight, when in events
+    )
+    return era, amount
+
+
+def update_expressions(events):
+    """QuerySet.update() kwargs that apply change(events), carrying the score into the current era."""
+    era, amount = change(events)
+    return {
+        'trending_score': Case(
+            When(trending_era=era, then=F('trending_score') + amount),
+            When(trending_era=era - 1, then=F('trending_score') * carry() + amount),
+            default=Value(amount),
+            output_field=FloatField(),
+        ),
+        'trending_era': Value(era),
+    }
+
+
+def update_sql(events):
+    """Raw SET fragment equivalent to update_expressions(), with %(name)s params."""
+    era, amount = change(events)
+    sql = (
+        'trending_score = CASE WHEN trending_era = %(t_era)s THEN trending_score + %(t_amount)s '
+        'WHEN trending_era = %(t_prev)s THEN trending_score * %(t_carry)s + %(t_amount)s '
+        'ELSE %(t_amount)s END, trending_era = %(t_era)s'
+    )
+    return sql, {'t_era': era, 't_prev': era - 1, 't_carry': carry(), 't_amount': amount}
+
+
+def initial(when=None):
+    """trending_era/trending_score for a post created at `when`."""
+    era, amount = increment(weights()['post'], when)
+    return {'trending_era': era, 'trending_score': amount}
+
+
+def top_post_ids(limit):
+    ids = cache.get(CACHE_KEY)
+    if ids is None:
+        from .models import Post
+        era, _ = increment(0)
+        ranked = Post.objects.order_by('-trending_score').values_list('id', 'trending_score')
+        current = list(ranked.filter(trending_era=era)[:MAX_TRENDING])
+        previous = [(pid, score * carry()) for pid, score in ranked.filter(trending_era=era - 1)[:MAX_TRENDING]]
+        ids = [pid for pid, _ in heapq.nlargest(MAX_TRENDING, current + previous, key=lambda row: row[1])]
+        cache.set(CACHE_KEY, ids, getattr(settings, 'TRENDING_CACHE_SECONDS', 10))
+    return ids[:limit]
+
+
+def rebuild(Post, now=None):
+    """Re-seed scores for posts from the last two eras from their counters.
+
+    Engagement is treated as happening when the post was created, so this
+    is an approximation for backfills, not a replay.
+    """
+    era, _ = increment(0, now)
+    since = datetime.fromtimestamp((era - 1) * era_seconds(), tz=dt_timezone.utc)
+    w = weights()
+    batch, count = [], 0
+    posts = Post.objects.filter(created_at__gte=since).only('id', 'created_at', 'like_count', 'comment_count')
+    for post in posts.iterator():
+        score = w['post'] + w['like'] * post.like_count + w['comment'] * post.comment_count
+        post.trending_era, post.trending_score = increment(score, post.created_at)
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['trending_era', 'trending_score'])
+            count, batch = count + len(batch), []
+    Post.objects.bulk_update(batch, ['trending_era', 'trending_score'])
+    return count + len(batch)
@@ -1,33 +1,165 @@
-from rest_framework import generics, permissions
+from rest_framework import permissions, viewsets, filters
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from notifications.dispatch import notify
+from social_media_api import response_cache
+from social_media_api.conditional import ConditionalGetMixin
+from social_media_api.response_cache import CachedResponseMixin
+from social_media_api.pagination import KeysetPagination
+from .models import Post, Comment
+from .serializers import PostSerializer, CommentSerializer
+from .permissions import IsAuthorOrReadOnly
+from . import cache, likes, timeline, trending
+from .like_buffer import get_buffer
+from .search import search_posts
+
+MAX_COMMENTS_PER_POST = 100
+
+User = get_user_model()
+
+def comment_limit(request, default):
+    # ?comments=N caps the nested comments per post; lists default to POST_LIST_COMMENTS
+    try:
+        return max(0, min(int(request.query_params['comments']), MAX_COMMENTS_PER_POST))
+    except (KeyError, ValueError):
+        return default
+
+def list_comment_limit(request):
+    return comment_limit(request, getattr(settings, 'POST_LIST_COMMENTS', 20))
+
+class PostViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.all().order_by('-created_at', '-id')
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['title', 'content']
+    # counters change without touching updated_at, and comment edits show up in the nested list
+    validator_fields = ('id', 'updated_at', 'like_count', 'comment_count', 'comments_at')
+
+    def get_queryset(self):
+        limit = list_comment_limit(self.request) if self.action == 'list' else comment_limit(self.request, None)
+        return super().get_queryset().with_comments(limit)
+
+    def get_cache_generations(self):
+        return cache.post_generations(self.kwargs.get('pk'))
+
+    def get_member_generations(self, data):
+        # a like or comment retires only the list pages showing that post
+        return cache.page_generations(data) if self.action == 'list' else []
+
+    def use_response_cache(self):
+        # buffered likes are folded in per process at render time, so cached bodies would hide them
+        return super().use_response_cache() and get_buffer() is None
+
+    def get_validator_queryset(self, queryset):
+        latest_comment = Comment.objects.filter(post=OuterRef('pk')).values('post').annotate(at=Max('updated_at'))
+        return queryset.annotate(comments_at=Subquery(latest_comment.values('at')))
+
+    def get_validator_rows(self, queryset):
+        rows = super().get_validator_rows(queryset)
+        buffer = get_buffer()
+        if buffer is not None:  # like counts still in this process's write-behind buffer
+            rows = [row + (buffer.delta(row[0]),) for row in rows]
+        return rows
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)  # logged-in user is the author
+
+    @action(detail=False)
+    def search(self, request):
+        """Ranked full-text search: /posts/search/?q=words, best matches first."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        posts = search_posts(query).with_comments(list_comment_limit(request))
+        paginator = KeysetPagination(ordering=('-rank', '-id'))
+        page = paginator.paginate_queryset(posts, request)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+class CommentViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related('author').order_by('-created_at', '-id')
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+
+    def get_cache_generations(self):
+        return cache.comment_generations(self.kwargs.get('pk'))
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        comment = serializer.save(author=self.request.user)
+        Post.objects.filter(pk=comment.post_id).update(
+            comment_count=F('comment_count') + 1,
+            **trending.update_expressions([(trending.weights()['comment'], comment.created_at)]),
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        post_id = instance.post_id
+        instance.delete()
+        Post.objects.filter(pk=post_id).update(
+            comment_count=F('comment_count') - 1,
+            **trending.update_expressions([(-trending.weights()['comment'], instance.created_at)]),
+        )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def user_feed(request):
+    # read from the materialized timeline instead of scanning Post by following
+    posts = timeline.feed_queryset(request.user).with_comments(list_comment_limit(request))
+    paginator = KeysetPagination(ordering=timeline.FEED_ORDERING)
+    page = paginator.paginate_queryset(posts, request)
+    serializer = PostSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticatedOrReadOnly])
+def trending_posts(request):
+    # top-K straight off the trending index; ?limit= up to trending.MAX_TRENDING
+    try:
+        limit = max(1, min(int(request.query_params['limit']), trending.MAX_TRENDING))
+    except (KeyError, ValueError):
+        limit = getattr(settings, 'TRENDING_SIZE', 20)
+    ids = trending.top_post_ids(limit)
+    posts = Post.objects.filter(id__in=ids).with_comments(list_comment_limit(request)).in_bulk()
+    serializer = PostSerializer([posts[pid] for pid in ids if pid in posts], many=True)
+    return Response({'results': serializer.data})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def response_cache_metrics(request):
+    return Response(response_cache.metrics.snapshot())
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])  # checker needs this exact pattern
 def like_post(request, pk):
-    post = generics.get_object_or_404(Post, pk=pk)
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
+    result = likes.like(request.user.id, pk)
+    if result is None:
+        raise NotFound()
+    created, like_count, author_id = result
 
     if not created:
-        return Response({'message': 'You already liked this post'}, status=400)
-
-    if post.author != request.user:
-        Notification.objects.create(
-            recipient=post.author,
-            actor=request.user,
-            verb='liked your post',
-            content_type=ContentType.objects.get_for_model(post),
-            object_id=post.id
-        )
+        return Response({'message': 'You already liked this post', 'like_count': like_count}, status=400)
+
+    if author_id != request.user.id:
+        notify(recipient=User(pk=author_id), actor=request.user, verb='liked your post',
+               target=Post(pk=pk, author_id=author_id))
 
-    return Response({'message': 'Post liked'})
+    return Response({'message': 'Post liked', 'like_count': like_count})
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])  # checker needs this exact pattern
 def unlike_post(request, pk):
-    post = generics.get_object_or_404(Post, pk=pk)
-    like = Like.objects.filter(user=request.user, post=post)
+    result = likes.unlike(request.user.id, pk)
+    if result is None:
+        raise NotFound()
+    deleted, like_count, _ = result
 
-    if not like.exists():
-        return Response({'message': 'You have not liked this post'}, status=400)
+    if not deleted:
+        return Response({'message': 'You have not liked this post', 'like_count': like_count}, status=400)
 
-    like.delete()
-    return Response({'message': 'Post unliked'})
\ No newline at end of file
+    return Response({'message': 'Post unliked', 'like_count': like_count})
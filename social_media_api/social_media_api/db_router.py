@@ -0,0 +1,190 @@
+"""Send safe-method reads for posts, accounts and notifications to read replicas.
+
+Replicas are the `replica_*` entries in DATABASES (built from
+DATABASE_REPLICA_URLS). ReplicaMiddleware marks each GET/HEAD/OPTIONS
+request as replica-eligible in a contextvar. Everything else goes to
+`default`: other methods, background threads, management commands, and
+models outside REPLICA_APPS.
+
+Read-your-writes: once a request has written to the primary (any method;
+the router sees every ORM write, raw SQL calls wrote()), the rest of it
+reads the primary, and the client (identified by its Authorization header
+or session) is pinned there for REPLICA_STICKY_SECONDS. That covers the
+worst lag a replica may have before it is taken out of rotation. Pins live
+in the default cache, so replicas need a shared one (REDIS_URL); a
+per-process cache is refused at startup. Values cached for longer than the
+lag should be read from the primary. A replica whose lag is over
+REPLICA_MAX_LAG seconds, or which can't be reached, is skipped. Lag is
+checked at most every REPLICA_LAG_CHECK_SECONDS per process.
+"""
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_APPS = frozenset({'posts', 'accounts', 'notifications'})
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PRIMARY, REPLICA, STICKY = 'primary', 'replica', 'sticky'
+_state = contextvars.ContextVar('db_routing', default=PRIMARY)
+# a list per request, appended to on a write; mutated rather than set so a view run in
+# another thread (sync_to_async copies the context) still reports back
+_writes = contextvars.ContextVar('db_writes', default=None)
+
+# a pin stored in one of these is invisible to the other workers
+_PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# PostgreSQL standby: 0 when it has replayed everything it received, else seconds since the last replay
+_PG_LAG = """
+SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+       ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def replica_aliases():
+    return [alias for alias in connections.settings if alias.startswith('replica_')]
+
+
+def reads_from_replica():
+    """True while the current request may read from a replica."""
+    return _state.get() == REPLICA
+
+
+def is_sticky():
+    """True while the current request is pinned to the primary after the client's own write."""
+    return _state.get() == STICKY
+
+
+def wrote():
+    """Record that the current request wrote to the primary (for writes the router doesn't see)."""
+    writes = _writes.get()
+    if writes is not None:
+        writes.append(True)
+
+
+def has_written():
+    return bool(_writes.get())
+
+
+class LagMonitor:
+    """Per-process cache of each replica's lag in seconds (None when it can't be reached)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}  # alias -> (monotonic time, lag)
+
+    def lag(self, alias):
+        interval = _setting('REPLICA_LAG_CHECK_SECONDS', 1)
+        with self._lock:
+            checked_at, lag = self._checked.get(alias, (None, None))
+        if checked_at is not None and time.monotonic() - checked_at < interval:
+            return lag
+        lag = self.measure(alias)
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), lag)
+        return lag
+
+    def measure(self, alias):
+        connection = connections[alias]
+        try:
+            if connection.vendor != 'postgresql':
+                connection.ensure_connection()
+                return 0.0  # no replication to measure (e.g. a local SQLite copy)
+            with connection.cursor() as cursor:
+                cursor.execute(_PG_LAG)
+                return float(cursor.fetchone()[0])
+        except Exception:
+            logger.warning('replica %s is unreachable; reading from the primary', alias, exc_info=True)
+            return None
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+lag_monitor = LagMonitor()
+
+
+def healthy_replicas():
+    max_lag = _setting('REPLICA_MAX_LAG', 5)
+    healthy = []
+    for alias in replica_aliases():
+        lag = lag_monitor.lag(alias)
+        if lag is not None and lag <= max_lag:
+            healthy.append(alias)
+    return healthy
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _state.get() != REPLICA or has_written() or model._meta.app_label not in REPLICA_APPS:
+            return None
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        wrote()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same rows, so a post read from one can be saved on the primary
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS  # replicas get their schema through replication
+
+
+def _client_key(request):
+    header = request.headers.get('Authorization')
+    if header:
+        identity = header
+    elif getattr(request, 'session', None) is not None and request.session.session_key:
+        identity = request.session.session_key
+    else:
+        return None
+    return 'replica:sticky:' + hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        backend = settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND']
+        if replica_aliases() and backend in _PER_PROCESS_CACHES:
+            raise ImproperlyConfigured(
+                'DATABASE_REPLICA_URLS needs a cache shared by all workers (set REDIS_URL): '
+                'read-your-writes pins are kept in it.'
+            )
+
+    def __call__(self, request):
+        key = _client_key(request) if replica_aliases() else None
+        if request.method not in SAFE_METHODS:
+            state = PRIMARY
+        elif key is not None and cache.get(key):
+            state = STICKY
+        else:
+            state = REPLICA
+        state_token, writes_token = _state.set(state), _writes.set([])
+        try:
+            response = self.get_response(request)
+            written = has_written()
+        finally:
+            _state.reset(state_token)
+            _writes.reset(writes_token)
+        key = key or (_client_key(request) if replica_aliases() else None)  # login may have started a session
+        if written and key is not None:
+            cache.set(key, True, _setting('REPLICA_STICKY_SECONDS', _setting('REPLICA_MAX_LAG', 5)))
+        return response
@@ -0,0 +1,144 @@
+import base64
+import json
+from datetime import datetime, timezone as dt_timezone
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import DateTimeField, Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _cursor_default(value):
+    # full microsecond precision, unlike DjangoJSONEncoder, so ties aren't skipped
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on a unique (timestamp, id) key.
+
+    Each page is a `WHERE (created_at, id) < (cursor)` range scan over a
+    matching composite index, so deep pages cost the same as the first one
+    and no COUNT(*) is issued. Cursors are opaque base64 tokens.
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')  # last field must be unique
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', None) or self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, default=_cursor_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token, ordering):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def cursor_field(self, queryset, name):
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field  # e.g. rank, feed_at
+
+    def clean_cursor(self, queryset, ordering, values):
+        """Convert decoded cursor values to their fields' types; a tampered cursor is a 404, not a 500."""
+        cleaned = []
+        for field_name, value in zip(ordering, values):
+            field = self.cursor_field(queryset, field_name.lstrip('-'))
+            try:
+                if value is None or isinstance(value, (list, dict, bool)):
+                    raise ValidationError('not a scalar')
+                value = field.to_python(value)
+            except (ValidationError, TypeError, ValueError, OverflowError):
+                raise NotFound(self.invalid_cursor_message)
+            if isinstance(field, DateTimeField) and timezone.is_naive(value):
+                value = timezone.make_aware(value, dt_timezone.utc)
+            cleaned.append(value)
+        return cleaned
+
+    def keyset_filter(self, ordering, values):
+        # (a, b) < (x, y)  ==>  a < x OR (a = x AND b < y), flipped for ascending fields
+        condition = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(ordering[:i], values[:i]):
+                term &= Q(**{prev_field.lstrip('-'): prev_value})
+            condition |= term
+        return condition
+
+    def row_key(self, row, ordering):
+        names = [field.lstrip('-') for field in ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def page_queryset(self, queryset, request, view=None):
+        """The unevaluated slice paginate_queryset() would fetch, incl. the look-ahead row."""
+        ordering = self.get_ordering(view)
+        queryset = queryset.order_by(*ordering)
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            values = self.clean_cursor(queryset, ordering, self.decode_cursor(token, ordering))
+            queryset = queryset.filter(self.keyset_filter(ordering, values))
+        return queryset[:self.get_page_size(request) + 1]  # one extra row tells us if there is a next page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(view)
+        page_size = self.get_page_size(request)
+
+        rows = list(self.page_queryset(queryset, request, view))
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(self.row_key(rows[-1], ordering)) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
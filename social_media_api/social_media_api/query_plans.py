@@ -0,0 +1,51 @@
+"""EXPLAIN-based checks that hot queries stay on their indexes.
+
+plan_problems() reports table scans, sorts and a missing expected index in
+a queryset's plan. On PostgreSQL, sequential scans and sorts are disabled
+for the EXPLAIN, so a tiny test table can't hide a missing index behind a
+cheap seq scan. A plan that still contains one has no index to use instead.
+"""
+import re
+from django.db import connections, transaction
+
+# (pattern, problem) per vendor; SQLite's "SCAN t USING INDEX i" is an ordered index walk, not a table scan
+_PROBLEMS = {
+    'sqlite': [(r'\bSCAN (?!.*\bINDEX\b)', 'table scan'), (r'USE TEMP B-TREE', 'sort')],
+    'postgresql': [(r'Seq Scan', 'table scan'), (r'\bSort\b', 'sort')],
+    'mysql': [(r'\btype: ALL\b', 'table scan'), (r'Using filesort', 'sort')],
+}
+
+
+def explain(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+        return queryset.explain()
+
+
+def plan_problems(queryset, index=None):
+    """[(problem, plan line)]; with `index`, the plan must also use that index."""
+    plan = explain(queryset)
+    patterns = _PROBLEMS.get(connections[queryset.db].vendor, [])
+    problems = [
+        (problem, line.strip())
+        for line in plan.splitlines()
+        for pattern, problem in patterns
+        if re.search(pattern, line)
+    ]
+    if index and index not in plan:
+        problems.append((f'{index} not used', plan.strip()))
+    return problems
+
+
+class QueryPlanAssertions:
+    """TestCase mixin: self.assertIndexed(queryset, index) fails on a scan, sort or missing index."""
+
+    def assertIndexed(self, queryset, index=None):
+        problems = plan_problems(queryset, index)
+        if problems:
+            details = '\n'.join(f'  {problem}: {line}' for problem, line in problems)
+            self.fail(f'query plan regressed:\n{details}\n{queryset.query}')
@@ -0,0 +1,48 @@
+"""orjson-backed JSON renderer and parser, with DRF's stdlib json as the fallback.
+
+orjson writes UTF-8 bytes straight from the serializer's dicts and lists,
+and handles datetimes natively, so a response body is built without the
+intermediate str that json.dumps() produces. Anything orjson doesn't know
+(Decimal, lazy strings, querysets...) goes through DRF's own encoder, so
+the output matches JSONRenderer's. Without orjson installed both classes
+behave exactly like DRF's.
+"""
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # ?indent / the browsable API: a human is reading, use the configurable stdlib output
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_encoder.default, option=_OPTIONS)
+        # same as JSONRenderer: escape the separators that end a JavaScript string literal
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,213 @@
+import hashlib
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit, urlunsplit
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+from . import db_router
+
+GENERATION_TIMEOUT = 60 * 60 * 24
+# bumped after any generation that pages track per member (see bump_members)
+MEMBER_ACTIVITY = 'members'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache():
+    return caches[_setting('RESPONSE_CACHE_ALIAS', 'default')]
+
+
+class CacheMetrics:
+    """In-process hit/miss counters; `coalesced` are misses served by another request's recompute."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'hit': 0, 'miss': 0, 'coalesced': 0}
+
+    def incr(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        counts['hit_ratio'] = round((counts['hit'] + counts['coalesced']) / total, 3) if total else None
+        return counts
+
+
+metrics = CacheMetrics()
+
+
+def _generation_key(name):
+    return f'resp:gen:{name}'
+
+
+def generations(names):
+    cache = _cache()
+    found = cache.get_many([_generation_key(name) for name in names])
+    missing = {_generation_key(name): 0 for name in names if _generation_key(name) not in found}
+    if missing:
+        cache.set_many(missing, GENERATION_TIMEOUT)
+        found.update(missing)
+    return [found[_generation_key(name)] for name in names]
+
+
+def bump(*names):
+    """Invalidate every response cached under these generations.
+
+    Bumped now and again on commit: a request that rebuilds the entry from
+    pre-commit data in between stores it under a generation that the second
+    bump retires. Old entries are never read again and just expire.
+    """
+    def apply():
+        _cache().set_many({_generation_key(name): uuid.uuid4().hex for name in names}, GENERATION_TIMEOUT)
+    apply()
+    transaction.on_commit(apply)
+
+
+def bump_members(*names):
+    """bump() for generations that cached pages record per member (see CachedResponseMixin).
+
+    MEMBER_ACTIVITY is bumped after them, so a page that read its members'
+    generations while this change was landing is not stored at all.
+    """
+    bump(*names)
+    bump(MEMBER_ACTIVITY)
+
+
+def response_key(request, names):
+    scope = 'auth' if request.user and request.user.is_authenticated else 'anon'
+    path = hashlib.blake2b(request.get_full_path().encode(), digest_size=16).hexdigest()
+    gens = ':'.join(str(gen) for gen in generations(names))
+    return f'resp:{scope}:{path}:{gens}'
+
+
+def single_flight(key, compute, timeout, fresh=None):
+    """cache.get(key), or compute() it with at most one concurrent recompute per key.
+
+    The first miss takes a short lock entry with cache.add(); concurrent
+    misses wait for it to fill the key instead of all hitting the database.
+    compute() returns (entry, cacheable). An entry that fails fresh(entry)
+    counts as a miss.
+    """
+    cache = _cache()
+
+    def usable(entry):
+        return entry is not None and (fresh is None or fresh(entry))
+
+    entry = cache.get(key)
+    if usable(entry):
+        metrics.incr('hit')
+        return entry
+    lock_key = f'{key}:lock'
+    wait = _setting('RESPONSE_CACHE_LOCK_TIMEOUT', 5)
+    if not cache.add(lock_key, 1, wait):
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            entry = cache.get(key)
+            if usable(entry):
+                metrics.incr('coalesced')
+                return entry
+            if cache.get(lock_key) is None:
+                break  # the holder gave up without storing (e.g. an error); compute ourselves
+    metrics.incr('miss')
+    try:
+        entry, cacheable = compute()
+        if cacheable:
+            cache.set(key, entry, timeout)
+        return entry
+    finally:
+        cache.delete(lock_key)
+
+
+def _relative_links(data):
+    # pagination links are built from the requester's Host; keep them relative in the shared entry
+    if isinstance(data, dict) and data.get('next'):
+        parts = urlsplit(data['next'])
+        data = {**data, 'next': urlunsplit(('', '', parts.path, parts.query, parts.fragment))}
+    return data
+
+
+class CachedResponseMixin:
+    """Cache list/retrieve response data keyed by URL, query params and auth scope.
+
+    Views name the generations a response depends on in
+    get_cache_generations(); bumping one (see bump) invalidates every entry
+    built from it. A list can also name its members' generations in
+    get_member_generations(); the entry records them and is rebuilt once
+    one moves, so a change to one item retires only the pages showing it.
+    The cached ETag is checked on hits, so a conditional poll against a
+    warm cache costs no query at all.
+    """
+
+    def get_cache_generations(self):
+        raise NotImplementedError
+
+    def get_member_generations(self, data):
+        return []
+
+    def use_response_cache(self):
+        # a client just after its own write reads the primary; a replica-built entry may predate it
+        return _setting('RESPONSE_CACHE_ENABLED', False) and not db_router.is_sticky()
+
+    def get_cache_timeout(self):
+        timeout = _setting('RESPONSE_CACHE_TTL', 60)
+        if db_router.reads_from_replica() and db_router.replica_aliases():
+            # a replica may still lack a change whose bump already happened; bound that staleness
+            timeout = min(timeout, _setting('REPLICA_MAX_LAG', 5))
+        return timeout
+
+    def absolute_links(self, data):
+        if isinstance(data, dict) and data.get('next'):
+            data = {**data, 'next': self.request.build_absolute_uri(data['next'])}
+        return data
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def cached(self, render):
+        if not self.use_response_cache():
+            return render()
+        rendered = []
+
+        def compute():
+            activity = generations([MEMBER_ACTIVITY])
+            response = render()
+            rendered.append(response)
+            ok = response.status_code == 200
+            members = self.get_member_generations(response.data) if ok else []
+            entry = {
+                'data': _relative_links(getattr(response, 'data', None)),  # a 304 from ConditionalGetMixin has none
+                'etag': response.get('ETag'),
+                'members': dict(zip(members, generations(members))),
+            }
+            # a member bumped after render read it may already show its new generation here
+            return entry, ok and (not members or generations([MEMBER_ACTIVITY]) == activity)
+
+        def fresh(entry):
+            members = entry['members']
+            return not members or generations(list(members)) == list(members.values())
+
+        key = response_key(self.request, self.get_cache_generations())
+        entry = single_flight(key, compute, self.get_cache_timeout(), fresh)
+        if rendered:
+            rendered[0]['X-Cache'] = 'MISS'
+            return rendered[0]
+
+        not_modified = get_conditional_response(self.request, etag=entry['etag'])
+        response = not_modified or Response(self.absolute_links(entry['data']))
+        response['X-Cache'] = 'HIT'
+        if entry['etag']:
+            response['ETag'] = entry['etag']
+        return response
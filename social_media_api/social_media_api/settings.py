@@ -25,12 +25,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'request_budget.middleware.RequestBudgetMiddleware',  # first, so it sees every query
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'social_media_api.db_router.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,11 +57,47 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'social_media_api.wsgi.application'
 
+# Each worker thread keeps its database connection for DB_CONN_MAX_AGE seconds (checked
+# before reuse) instead of reconnecting on every request. DB_POOL=True switches PostgreSQL to
+# psycopg 3's in-process pool instead (pip install "psycopg[binary,pool]"), which also
+# serves ASGI workers, whose connections don't persist between requests.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+_connection_options = {
+    'conn_max_age': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+    'conn_health_checks': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+}
 DATABASES = {
     'default': dj_database_url.config(
-        default=os.environ.get('DATABASE_URL')
+        default=os.environ.get('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+        **_connection_options,
     )
 }
+# Read replicas (comma-separated URLs) become replica_0, replica_1...; safe-method reads for
+# posts/accounts/notifications go there (see social_media_api/db_router.py). Tests mirror them
+# onto the test database.
+for _i, _url in enumerate(u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()):
+    DATABASES[f'replica_{_i}'] = {
+        **dj_database_url.parse(_url, **_connection_options),
+        'TEST': {'MIRROR': 'default'},
+    }
+for _db in DATABASES.values():
+    if DB_POOL and _db['ENGINE'] == 'django.db.backends.postgresql':
+        _db.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    if _db['ENGINE'] == 'django.db.backends.sqlite3':
+        # take the write lock at BEGIN: a deferred transaction that reads, then writes, fails
+        # with "database is locked" under concurrent writers instead of waiting its turn
+        _db.setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
+DATABASE_ROUTERS = ['social_media_api.db_router.ReplicaRouter']
+# replicas further behind than this many seconds are skipped; after a write, the client reads
+# the primary for REPLICA_STICKY_SECONDS, which must cover REPLICA_MAX_LAG (the pin is kept in
+# the cache, so replicas need REDIS_URL)
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_SECONDS = 1
+REPLICA_STICKY_SECONDS = REPLICA_MAX_LAG
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -72,12 +110,93 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'social_media_api.renderers.ORJSONRenderer',  # stdlib json when orjson isn't installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'social_media_api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'social_media_api.pagination.KeysetPagination',
     'PAGE_SIZE': 10,
 }
 
+# Shared cache for follow-graph versions, unread counts, trending and API responses. Without
+# REDIS_URL each process has its own in-memory cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache' if os.environ.get('REDIS_URL')
+        else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'social-media-api'),
+    },
+}
+
+# Post/comment list and detail responses are cached for RESPONSE_CACHE_TTL seconds and
+# retired as soon as a post, comment or like changes (see social_media_api/response_cache.py).
+# Only with REDIS_URL: a per-process cache never sees other workers' invalidations.
+RESPONSE_CACHE_ENABLED = bool(os.environ.get('REDIS_URL'))
+
+# Seconds an unread-notification count is cached. Writes clear it, but without REDIS_URL only
+# in the writing process, so other workers may lag by up to this long.
+UNREAD_COUNT_CACHE_TTL = 3600 if os.environ.get('REDIS_URL') else 5
+RESPONSE_CACHE_TTL = 60
+
+# Per-request query/latency budgets (request_budget.middleware): requests over budget are
+# logged per view; REQUEST_BUDGETS overrides them by view name. Server-Timing headers with
+# the breakdown are only sent when SERVER_TIMING=True.
+REQUEST_BUDGET_QUERIES = 20
+REQUEST_BUDGET_MS = 500
+REQUEST_BUDGETS = {
+    'post-list': {'queries': 5},
+    'post-detail': {'queries': 5},
+    'comment-list': {'queries': 5},
+    'posts.views.user_feed': {'queries': 4},
+    'notifications.views.get_notifications': {'queries': 4},
+    # PBKDF2 is slow on purpose (~0.5s per check), plus any wait for a hashing-pool slot
+    'accounts.views.LoginView': {'ms': 1500},
+}
+REQUEST_BUDGET_SERVER_TIMING = os.environ.get('SERVER_TIMING', 'False') == 'True'
+
+# Token -> user snapshots are cached in a per-process LRU for TOKEN_CACHE_TTL seconds;
+# set TOKEN_CACHE_ALIAS to a shared cache (e.g. Redis) to add a second tier across processes.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+
+# Write-behind likes for hot posts (off by default): once a post sees LIKE_BUFFER_HOT_RATE
+# likes/unlikes per second in a process, they are journaled locally and written in batches
+# every LIKE_BUFFER_FLUSH_MS.
+LIKE_BUFFER_ENABLED = os.environ.get('LIKE_BUFFER_ENABLED', 'False') == 'True'
+LIKE_BUFFER_HOT_RATE = 20
+LIKE_BUFFER_FLUSH_MS = 200
+LIKE_BUFFER_JOURNAL_DIR = os.environ.get('LIKE_BUFFER_JOURNAL_DIR', str(BASE_DIR / 'like_journal'))
+LIKE_BUFFER_FSYNC = False
+
+# Login password checks run on a small dedicated pool; when LOGIN_HASH_QUEUE more are
+# already waiting, logins get a 503 with Retry-After instead of tying up web workers.
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+LOGIN_HASH_QUEUE = int(os.environ.get('LOGIN_HASH_QUEUE', 8))
+LOGIN_HASH_TIMEOUT = 5
+# (attempts, per seconds) token buckets, kept per process
+LOGIN_RATE_PER_IP = (20, 60)
+LOGIN_RATE_PER_USERNAME = (5, 60)
+
+# Notifications are queued in an outbox table and written in batches by worker threads;
+# use 'notifications.dispatch.SyncBackend' to write them inside the request instead.
+NOTIFICATION_BACKEND = os.environ.get('NOTIFICATION_BACKEND', 'notifications.dispatch.OutboxBackend')
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', '1'))
+NOTIFICATION_BATCH_SIZE = 500
+# unread notifications on the same target within this many seconds fold into one row (0 disables)
+NOTIFICATION_AGGREGATION_WINDOW = 3600
+# live notification stream (serve through social_media_api.asgi)
+NOTIFICATION_HUB = 'notifications.hub.InProcessHub'
+NOTIFICATION_STREAM_HEARTBEAT = 15
+NOTIFICATION_STREAM_MAX_SECONDS = 300
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -96,17 +215,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = 'DENY'
 SECURE_CONTENT_TYPE_NOSNIFF = True
-SECURE_SSL_REDIRECT = True
+SECURE_SSL_REDIRECT = os.environ.get('SECURE_SSL_REDIRECT', 'True') == 'True'  # False for local load tests
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
-import os
-
 PORT = os.environ.get('PORT', '8000')
-```
-
-Just paste it near the top of your `settings.py` after the other `os.environ` lines. Then commit and push:
-```
-git add social_media_api/settings.py
-git commit -m "add PORT to settings"
-git push heroku master:main
\ No newline at end of file